@@ -1,9 +1,19 @@
-from typing import TypedDict, List, TypeVar, Callable
+from typing import TypedDict, List, Tuple, TypeVar, Callable, Optional, Hashable
 from operator import itemgetter
 from math import inf, sqrt, log
 from functools import reduce, partial
-from random import randint
+from random import randint, Random
 from sys import maxsize
+from concurrent.futures import ProcessPoolExecutor
+from time import monotonic
+import numpy as np
+import numpy.typing as npt
+from .transposition import (
+    TranspositionTable,
+    make_transposition_table,
+    lookup_transposition,
+    store_transposition
+)
 
 
 State = TypeVar("State")
@@ -15,6 +25,22 @@ class Node(TypedDict):
     score: int
     moves: List[dict] # list of Nodes (recursive)
 
+'''
+  Nodes of the in-place engine (grow_tree()) also cache what the game functions
+  say about their state, computed once when the node is created, see
+  cache_moves(). Descending the tree then only needs the statistics.
+'''
+class CachedNode(Node, total=False):
+    terminal: bool
+    untried_moves: List[Move] # valid moves without a child yet
+    # Only with the solver: the exact value of the node for the player that
+    # moved into it (1 win, 0 draw, -1 loss), once it is known
+    proven: Optional[int]
+    # Only with the solver: bounds on that value while it isn't proven yet,
+    # -1 and 1 when missing, see node_bounds()
+    lower: int
+    upper: int
+
 
 '''
     Upper Confidence Bound 1 applied to trees,
@@ -29,6 +55,31 @@ def uct(exploration, total_rollouts_parent, node):
 
     return score / num_rollouts + exploration * sqrt(log(total_rollouts_parent) / num_rollouts)
 
+'''
+  Vectorised uct(): scores all of a node's children at once from arrays of
+  their statistics. Unvisited children score infinity.
+'''
+def uct_array(exploration, total_rollouts_parent, num_rollouts, scores):
+    # type: (float, int, npt.NDArray[np.int64], npt.NDArray[np.int64]) -> npt.NDArray[np.float64]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(num_rollouts > 0,
+                        scores / num_rollouts
+                        + exploration * np.sqrt(np.log(total_rollouts_parent) / num_rollouts),
+                        np.inf)
+
+'''
+  Returns the index of the child with the highest UCT value.
+  There is a possibility that multiple moves may have the same statistics,
+  giving the same UCT values; the tie-break is settled with get_random_int()
+  the same way select() does.
+'''
+def pick_max_uct(exploration, get_random_int, total_rollouts_parent, num_rollouts, scores):
+    # type: (float, Callable[[], int], int, npt.NDArray[np.int64], npt.NDArray[np.int64]) -> int
+    ucts = uct_array(exploration, total_rollouts_parent, num_rollouts, scores)
+    ties = np.flatnonzero(ucts == ucts.max())
+
+    return int(ties[get_random_int() % len(ties)])
+
 def pick_best_move(exploration, node):
     # type: (float, Node) -> int
     # TO-DO: We could just grab this from node['num_rollouts']...
@@ -60,6 +111,106 @@ def pick_unexplored_move(get_random_int, get_valid_moves, is_terminal, node):
 
     return unexplored_moves[get_random_int() % len(unexplored_moves)]
 
+'''
+  Picks the child of 'node' with the highest UCT value.
+  There is a possibility that multiple moves may have the same statistics,
+  giving the same UCT values; the tie-break is settled with get_random_int().
+  With the solver, only children that could still do better than the best
+  result already guaranteed by a sibling are picked, see node_bounds(): proven
+  children never are.
+'''
+def pick_child(exploration, get_random_int, node, vectorized=False, solver=False):
+    # type: (float, Callable[[], int], Node, bool, bool) -> Node
+    children = node['moves']
+
+    if solver:
+        bounds = list(map(node_bounds, children))
+        best_lower = max(lower for lower, _ in bounds)
+        # A transposed node (see expand_with_transpositions()) can have all of
+        # its shared children decided before its own proof catches up
+        children = ([child for child, (_, upper) in zip(children, bounds) if upper > best_lower] or
+                    [child for child in children if child.get('proven') != -1] or
+                    children)
+
+    # Better for games with a wide branching factor, where the overhead of
+    # building the arrays is smaller than calling uct() once per child
+    if vectorized:
+        return children[pick_max_uct(
+            exploration,
+            get_random_int,
+            node['num_rollouts'],
+            np.fromiter(map(itemgetter('num_rollouts'), children),
+                        dtype=np.int64,
+                        count=len(children)),
+            np.fromiter(map(itemgetter('score'), children),
+                        dtype=np.int64,
+                        count=len(children)))]
+
+    # Here we just grab node['num_rollouts'] instead of
+    # calculating it from the child moves
+    # If there is no possibility of node['num_rollouts'] being
+    # out of date, then it is better to do this
+    indexed_ucts = list(map(lambda index_node: {
+        'index': index_node[0],
+        'uct': uct(exploration, node['num_rollouts'], index_node[1])
+    }, enumerate(children)))
+
+    max_ucts = reduce(
+        lambda max_values, current:
+            max_values + [current] if current['uct'] == max_values[0]['uct']
+            else [current] if current['uct'] > max_values[0]['uct']
+            else max_values,
+        indexed_ucts[1:],
+        [indexed_ucts[0]])
+
+    return children[max_ucts[get_random_int() % len(max_ucts)]['index']]
+
+def cache_moves(get_valid_moves, is_terminal, node):
+    # type: (Callable[[State], list[Move]], Callable[[State], bool], CachedNode) -> CachedNode
+    explored_moves = list(map(lambda child: child['move'], node['moves']))
+    node['terminal'] = is_terminal(node['state'])
+    node['untried_moves'] = ([] if node['terminal'] else
+                             [move for move in get_valid_moves(node['state'])
+                              if move not in explored_moves])
+
+    return node
+
+'''
+  Removes a random move from the node's untried moves and returns it, or None
+  when all of them have been tried (or the state is terminal).
+  Swaps it with the last one first, so that removing it is O(1).
+'''
+def pop_untried_move(get_random_int, node):
+    # type: (Callable[[], int], CachedNode) -> Move | None
+    untried_moves = node['untried_moves']
+
+    if not untried_moves:
+        return None
+
+    i = get_random_int() % len(untried_moves)
+    untried_moves[i], untried_moves[-1] = untried_moves[-1], untried_moves[i]
+
+    return untried_moves.pop()
+
+'''
+  Counterpart of select() for trees of CachedNodes, returning the nodes along
+  the way (starting with the root) instead of the moves: a pure walk over the
+  statistics, without calling any game functions. Stops at the first node that is
+  terminal or still has untried moves, or with the solver, whose value is
+  proven.
+'''
+def descend(exploration, get_random_int, tree, vectorized=False, solver=False):
+    # type: (float, Callable[[], int], CachedNode, bool, bool) -> list[CachedNode]
+    current_node = tree
+    path = [tree]
+
+    while (not current_node['terminal'] and not current_node['untried_moves']
+           and not (solver and current_node.get('proven') is not None)):
+        current_node = pick_child(exploration, get_random_int, current_node, vectorized, solver)
+        path.append(current_node)
+
+    return path
+
 def select(exploration, get_random_int, get_valid_moves, is_terminal, tree):
     # type: (float, Callable[[], int], Callable[[State], list[Move]], Callable[[State], bool], Node) -> list[Move]
     current_node = tree
@@ -68,30 +219,8 @@ def select(exploration, get_random_int, get_valid_moves, is_terminal, tree):
     # If we *haven't* arrived at a not fully explored node or a terminal state
     while (len(get_valid_moves(current_node['state']))
            == len(current_node['moves'])) and not is_terminal(current_node['state']):
-        # Here we just grab current_node['num_rollouts'] instead of
-        # calculating it from the child moves
-        # If there is no possibility of current_node['num_rollouts'] being
-        # out of date, then it is better to do this
-        indexed_ucts = list(map(lambda index_node: {
-            'index': index_node[0],
-            'uct': uct(exploration, current_node['num_rollouts'], index_node[1])
-        }, enumerate(current_node['moves'])))
-
-        max_ucts = reduce(
-            lambda max_values, current:
-                max_values + [current] if current['uct'] == max_values[0]['uct']
-                else [current] if current['uct'] > max_values[0]['uct']
-                else max_values,
-            indexed_ucts[1:],
-            [indexed_ucts[0]])
-
-        # There is a possibility that multiple moves may have the same statistics,
-        # giving the same UCT values.
-        # Settle the tie-break
-        next_node = current_node['moves'][max_ucts[get_random_int() % len(max_ucts)]['index']]
-
-        current_node = next_node
-        path = path + [next_node['move']]
+        current_node = pick_child(exploration, get_random_int, current_node)
+        path.append(current_node['move'])
 
     return path
 
@@ -143,23 +272,135 @@ def replace_node(node, path, updated_node): # type: (Node, list[Move], Node) ->
                                              updated_node)]
     }
 
+'''
+  In-place counterpart of the "expansion" step: appends the new child directly
+  to node['moves'] instead of rebuilding the spine with replace_node()
+'''
+def expand_in_place(get_valid_moves, is_terminal, apply_move, node, move):
+    # type: (Callable[[State], list[Move]], Callable[[State], bool], Callable[[State, Move], State], Node, Move) -> CachedNode
+    child = cache_moves(get_valid_moves,
+                        is_terminal,
+                        { 'move': move,
+                          'state': apply_move(node['state'], move),
+                          'num_rollouts': 0,
+                          'score': 0,
+                          'moves': [] })
+    node['moves'].append(child)
+
+    return child
+
+'''
+  expand_in_place() for searches with a transposition table, which turns the
+  tree into a DAG.
+  If the new state was already reached through another move order, the new
+  child shares that node's state, its 'moves' list and its untried moves, i.e.
+  its whole subtree along with all the statistics in it. The child itself
+  still gets its own 'move', 'num_rollouts' and 'score', as those belong to the
+  edge from 'node': a shared node can be reached with a different move from
+  each of its parents.
+'''
+def expand_with_transpositions(get_valid_moves,
+                               is_terminal,
+                               apply_move,
+                               get_state_key,
+                               table,
+                               node,
+                               move):
+    # type: (Callable[[State], list[Move]], Callable[[State], bool], Callable[[State, Move], State], Callable[[State], Hashable], TranspositionTable, Node, Move) -> CachedNode
+    state = apply_move(node['state'], move)
+    key = get_state_key(state)
+    transposition = lookup_transposition(table, key)
+
+    if transposition is None:
+        child = cache_moves(get_valid_moves,
+                            is_terminal,
+                            { 'move': move,
+                              'state': state,
+                              'num_rollouts': 0,
+                              'score': 0,
+                              'moves': [] })
+        store_transposition(table, key, child)
+    else:
+        child = { 'move': move,
+                  'state': transposition['state'],
+                  'num_rollouts': 0,
+                  'score': 0,
+                  'moves': transposition['moves'],
+                  'terminal': transposition['terminal'],
+                  'untried_moves': transposition['untried_moves'] }
+
+    node['moves'].append(child)
+
+    return child
+
 def simulate (is_terminal,
               check_win,
               valid_moves,
               random_int,
               apply_move,
-              initial_state):
-    # type: (Callable[[State], bool], Callable[[State], int | None], Callable[[State], list[Move]], Callable[[], int], Callable[[State, Move], State], State) -> int | None
+              initial_state,
+              known_result=None,
+              rollout_policy=None):
+    # type: (Callable[[State], bool], Callable[[State], int | None], Callable[[State], list[Move]], Callable[[], int], Callable[[State, Move], State], State, Callable[[State], tuple[bool, int | None]] | None, Callable[[State, Callable[[], int]], Move] | None) -> int | None
+    if known_result is not None:
+        known, winner = known_result(initial_state)
+
+        if known:
+            return winner
+
     state = initial_state
 
     while not is_terminal(state):
-        moves = valid_moves(state)
-        next_move = moves[random_int() % len(moves)]
+        if rollout_policy is None:
+            moves = valid_moves(state)
+            next_move = moves[random_int() % len(moves)]
+        else:
+            next_move = rollout_policy(state, random_int)
 
         state = apply_move(state, next_move)
 
     return check_win(state)
 
+'''
+  Leaf parallelisation: runs 'num_rollouts' playouts from the same state so
+  that the cost of selection and expansion is shared between all of them.
+  If a 'batch_rollout' hook is given, the playouts are handed to it in one go
+  instead (e.g. a vectorised implementation for a specific game).
+  If a 'known_result' hook is given and returns (True, winner) for the state
+  (e.g. from a tablebase), there is nothing to play out: every rollout gets
+  that winner.
+  A 'rollout_policy' picks the moves of the playouts, given the state and the
+  random number generator, instead of picking them uniformly at random.
+'''
+def simulate_many(is_terminal,
+                  check_win,
+                  valid_moves,
+                  random_int,
+                  apply_move,
+                  initial_state,
+                  num_rollouts,
+                  batch_rollout=None,
+                  known_result=None,
+                  rollout_policy=None):
+    # type: (Callable[[State], bool], Callable[[State], int | None], Callable[[State], list[Move]], Callable[[], int], Callable[[State, Move], State], State, int, Callable[[State, int, Callable[[], int]], list[int | None]] | None, Callable[[State], tuple[bool, int | None]] | None, Callable[[State, Callable[[], int]], Move] | None) -> list[int | None]
+    if known_result is not None:
+        known, winner = known_result(initial_state)
+
+        if known:
+            return [winner] * num_rollouts
+
+    if batch_rollout is not None:
+        return batch_rollout(initial_state, num_rollouts, random_int)
+
+    return [simulate(is_terminal,
+                     check_win,
+                     valid_moves,
+                     random_int,
+                     apply_move,
+                     initial_state,
+                     rollout_policy=rollout_policy)
+            for _ in range(num_rollouts)]
+
 def is_path_valid(node, path):
     # type: (Node, list[Move]) -> bool
     while path:
@@ -217,87 +458,705 @@ def backprop(who_won, path, node, previous_player):
                           node['state']['player_to_move'])]
     }
 
+'''
+  In-place counterpart of backprop(), for a batch of playout results.
+  'path' is the list of nodes returned by descend() (plus the expanded node,
+  if any), so we can update the counters directly while walking down it. Each
+  node's visit count goes up by len(results), and its score by the sum of the
+  rewards, relative to the player that moved *into* it i.e. the
+  player_to_move of the node before it.
+'''
+def backprop_results_in_place(results, path, previous_player):
+    # type: (list[int | None], list[Node], int) -> None
+    num_decisive = len(results) - results.count(None)
+
+    for node in path:
+        node['num_rollouts'] += len(results)
+        # wins - losses
+        node['score'] += 2 * results.count(previous_player) - num_decisive
+        previous_player = node['state']['player_to_move']
+
+'''
+  MCTS-Solver (Winands, Björnsson and Saito) with score bounds (Cazenave and
+  Saffidine): on top of the usual statistics, every node gets a lower and an
+  upper bound on its game-theoretic value, for the player that moved into it
+  (1 win, 0 draw, -1 loss). The value is 'proven' once they meet.
+  - A terminal node is proven by its result.
+  - The player choosing between the children of a node gets at least the best
+    of their lower bounds and at most the best of their upper bounds (an
+    untried move could be anything), which negated bound the node itself.
+  So a node is a proven loss as soon as one of its children is a proven win,
+  and a proven draw as soon as one of its children is, while none of the
+  others can be a win any more.
+  Selection only goes into children that could still beat the best result
+  already guaranteed by a sibling, stops at proven nodes and backpropagates
+  their value instead of simulating them, and the search stops once the root
+  is proven.
+  Assumes a two player, zero-sum game with alternating moves.
+'''
+def node_bounds(node):
+    # type: (CachedNode) -> tuple[int, int]
+    proven = node.get('proven')
+
+    if proven is not None:
+        return proven, proven
+
+    return node.get('lower', -1), node.get('upper', 1)
+
+def bounds_from_children(node):
+    # type: (CachedNode) -> tuple[int, int]
+    bounds = list(map(node_bounds, node['moves']))
+
+    if node['untried_moves']:
+        bounds.append((-1, 1))
+
+    return -max(upper for _, upper in bounds), -max(lower for lower, _ in bounds)
+
+def prove_from_children(node):
+    # type: (CachedNode) -> int | None
+    lower, upper = bounds_from_children(node)
+
+    return lower if lower == upper else None
+
+'''
+  Updates the bounds after a simulation from path[-1]: proves the leaf if it
+  is terminal, then goes up the path for as long as the bounds of the nodes
+  change, marking them proven when they meet
+'''
+def update_proofs(check_win, path):
+    # type: (Callable[[State], int | None], list[CachedNode]) -> None
+    leaf = path[-1]
+
+    if leaf['terminal'] and leaf.get('proven') is None and len(path) > 1:
+        mover = path[-2]['state']['player_to_move']
+        winner = check_win(leaf['state'])
+        leaf['proven'] = 0 if winner is None else 1 if winner == mover else -1
+
+    for node in reversed(path[:-1]):
+        lower, upper = bounds_from_children(node)
+
+        if (lower, upper) == node_bounds(node):
+            return
+
+        node['lower'], node['upper'] = lower, upper
+
+        if lower == upper:
+            node['proven'] = lower
+
+'''
+  Result to backpropagate from a proven node instead of simulating it, in
+  the form simulate() returns: the winner (None for a draw)
+'''
+def proven_winner(path):
+    # type: (list[CachedNode]) -> int | None
+    node = path[-1]
+
+    if node['proven'] == 0:
+        return None
+
+    mover = path[-2]['state']['player_to_move']
+
+    # The other player is the one to move in 'node'
+    return mover if node['proven'] == 1 else node['state']['player_to_move']
+
+'''
+  Final move choice with the solver: a proven win if there is one, otherwise
+  the robust child among the moves that guarantee the best result found so far
+  or could still beat it, leaving out proven losses
+'''
+def pick_solver_child(nodes):
+    # type: (list[CachedNode]) -> CachedNode
+    bounds = list(map(node_bounds, nodes))
+    best_lower = max(lower for lower, _ in bounds)
+    wins = [node for node, (lower, _) in zip(nodes, bounds) if lower == 1]
+    candidates = [node for node, (lower, upper) in zip(nodes, bounds)
+                  if upper > best_lower or lower == best_lower and upper > -1]
+
+    return pick_robust_child(wins or candidates or nodes)
+
+'''
+  https://ai.stackexchange.com/questions/16905/mcts-how-to-choose-the-final-action-from-the-root
+  Choose best move via the "robust child" method = highest # of visits
+  Tie-break strategy: random choice
+'''
+def pick_robust_child(nodes):
+    # type: (list[Node]) -> Node
+    max_rollouts = reduce(
+                    lambda most_visited, current_node:
+                        most_visited + [current_node] if
+                            current_node['num_rollouts'] == most_visited[0]['num_rollouts']
+                        else [current_node] if
+                            current_node['num_rollouts'] > most_visited[0]['num_rollouts']
+                        else most_visited,
+                    nodes[1:],
+                    [nodes[0]])
+
+    # There is a possibility that multiple moves may have the same statistics;
+    # i.e. having the same number of rollouts.
+    # Settle the tie-break
+    return max_rollouts[randint(0, len(max_rollouts) - 1)]
+
+'''
+  Everything a search needs apart from the tree itself and its random number
+  generator. Kept in one dict so that it can be sent to worker processes
+  (which means the functions in it must be picklable i.e. defined at the top
+  level of a module).
+'''
+class SearchSettings(TypedDict):
+    exploration: float
+    get_valid_moves: Callable[[State], List[Move]]
+    is_terminal: Callable[[State], bool]
+    apply_move: Callable[[State, Move], State]
+    check_win: Callable[[State], Optional[int]]
+    vectorized_select: bool
+    rollouts_per_leaf: int
+    batch_rollout: Optional[Callable[[State, int, Callable[[], int]], List[Optional[int]]]]
+    get_state_key: Optional[Callable[[State], Hashable]]
+    transposition_table_size: int
+    solver: bool
+    known_result: Optional[Callable[[State], Tuple[bool, Optional[int]]]]
+    rollout_policy: Optional[Callable[[State, Callable[[], int]], Move]]
+
+# Values of the optional settings when make_search_settings() isn't given them
+DEFAULT_SEARCH_OPTIONS = { 'vectorized_select': False,
+                           'rollouts_per_leaf': 1,
+                           'batch_rollout': None,
+                           'get_state_key': None,
+                           'transposition_table_size': 100000,
+                           'solver': False,
+                           'known_result': None,
+                           'rollout_policy': None }
+
+'''
+  The game functions are required, everything else defaults to
+  DEFAULT_SEARCH_OPTIONS, e.g.
+    make_search_settings(1.2, get_valid_moves, is_terminal, apply_move, check_win,
+                         rollouts_per_leaf=8)
+'''
+def make_search_settings(exploration, get_valid_moves, is_terminal, apply_move, check_win, **options):
+    # type: (float, Callable[[State], list[Move]], Callable[[State], bool], Callable[[State, Move], State], Callable[[State], int | None], object) -> SearchSettings
+    unknown = set(options) - set(DEFAULT_SEARCH_OPTIONS)
+
+    if unknown:
+        raise TypeError(f'Unknown search settings: {", ".join(sorted(unknown))}')
+
+    return { 'exploration': exploration,
+             'get_valid_moves': get_valid_moves,
+             'is_terminal': is_terminal,
+             'apply_move': apply_move,
+             'check_win': check_win,
+             **DEFAULT_SEARCH_OPTIONS,
+             **options }
+
+def make_root(state):
+    # type: (State) -> Node
+    return { 'state': state,
+             'num_rollouts': 0,
+             'score': 0,
+             'moves': [] }
+
+# None when the search doesn't use a transposition table
+def make_search_table(settings):
+    # type: (SearchSettings) -> TranspositionTable | None
+    if settings['get_state_key'] is None:
+        return None
+
+    return make_transposition_table(settings['transposition_table_size'])
+
+'''
+  Tree reuse with a transposition table: a new table holding just the nodes
+  reachable from 'root', the subtree that is being promoted to the new root.
+  Keeping the old table would keep every abandoned branch in memory, and let
+  expansion link the new tree back into them.
+'''
+def rebuild_search_table(settings, root):
+    # type: (SearchSettings, Node) -> TranspositionTable | None
+    table = make_search_table(settings)
+
+    if table is None:
+        return None
+
+    nodes = [root]
+
+    while nodes:
+        node = nodes.pop()
+        key = settings['get_state_key'](node['state'])
+
+        # Transposed nodes share their children, so these have been seen too
+        if key in table['entries']:
+            continue
+
+        store_transposition(table, key, node)
+        nodes.extend(node['moves'])
+
+    return table
+
+'''
+  How often (in iterations) grow_tree() looks at the clock and checks whether
+  it can stop early. Checking every iteration would cost more than it saves.
+'''
+CLOCK_CHECK_INTERVAL = 16
+
+class SearchReport(TypedDict):
+    iterations: int
+    elapsed_ms: float
+    stopped_early: bool
+    solved: bool # the root's value was proven by the solver
+
+'''
+  Estimate of how many more iterations the search will run: whatever is left of
+  the iteration budget and/or what fits before the deadline at the rate so far.
+  Either budget may be None (not set).
+'''
+def estimate_remaining_iterations(done, iterations, started, now, deadline):
+    # type: (int, int | None, float, float, float | None) -> float
+    remaining = inf if iterations is None else iterations - done
+
+    if deadline is not None and done > 0 and now > started:
+        remaining = min(remaining, done * (deadline - now) / (now - started))
+
+    return remaining
+
+'''
+  True if the most visited child of the root can no longer be overtaken (or
+  tied) by another child within 'remaining_visits' more visits, meaning that
+  more search can't change the robust child choice.
+  Root moves that haven't been expanded yet count as children with 0 visits.
+'''
+def is_root_decided(root, num_root_moves, remaining_visits):
+    # type: (Node, int, float) -> bool
+    visits = sorted(map(lambda child: child['num_rollouts'], root['moves']), reverse=True)
+    visits = visits + [0] * (num_root_moves - len(visits))
+
+    if len(visits) < 2:
+        # Only one move to choose from (it still has to be expanded though)
+        return len(root['moves']) == len(visits)
+
+    return visits[0] - visits[1] > remaining_visits
+
+'''
+  Runs up to 'iterations' rounds of selection, expansion, simulation and
+  backpropagation on 'tree', mutating it in place.
+  Unlike the copy-on-write functions above (replace_node(), backprop()) the cost
+  of an iteration doesn't grow with the number of nodes that have to be copied
+  along the path.
+  Also stops when the monotonic clock passes 'deadline' (if given; 'iterations'
+  may then be None for no limit), and with early_stop, when is_root_decided().
+  Both are only checked every CLOCK_CHECK_INTERVAL iterations, starting after
+  the first one.
+  With settings['solver'], also stops as soon as the root is proven, see
+  prove_from_children().
+'''
+def grow_tree(settings,
+              get_random_int,
+              tree,
+              iterations,
+              table=None,
+              deadline=None,
+              early_stop=False):
+    # type: (SearchSettings, Callable[[], int], Node, int | None, TranspositionTable | None, float | None, bool) -> SearchReport
+    (exploration, get_valid_moves, is_terminal, apply_move, check_win, vectorized_select,
+     rollouts_per_leaf, batch_rollout, get_state_key, solver, known_result,
+     rollout_policy) = itemgetter('exploration',
+                                  'get_valid_moves',
+                                  'is_terminal',
+                                  'apply_move',
+                                  'check_win',
+                                  'vectorized_select',
+                                  'rollouts_per_leaf',
+                                  'batch_rollout',
+                                  'get_state_key',
+                                  'solver',
+                                  'known_result',
+                                  'rollout_policy')(settings)
+
+    if 'terminal' not in tree:
+        cache_moves(get_valid_moves, is_terminal, tree)
+
+    if table is not None and lookup_transposition(table, get_state_key(tree['state'])) is None:
+        store_transposition(table, get_state_key(tree['state']), tree)
+
+    num_root_moves = len(tree['moves']) + len(tree['untried_moves'])
+    started = monotonic()
+    done = 0
+    stopped_early = False
+
+    while iterations is None or done < iterations:
+        if solver and tree.get('proven') is not None:
+            break
+
+        # Checked after the 1st, 17th, 33rd... iteration: always running at
+        # least one means that the root has a child to pick
+        if (done > 0 and (done - 1) % CLOCK_CHECK_INTERVAL == 0
+                and (deadline is not None or early_stop)):
+            now = monotonic()
+
+            if deadline is not None and now >= deadline:
+                break
+
+            if early_stop and is_root_decided(tree,
+                                              num_root_moves,
+                                              rollouts_per_leaf
+                                              * estimate_remaining_iterations(done,
+                                                                              iterations,
+                                                                              started,
+                                                                              now,
+                                                                              deadline)):
+                stopped_early = True
+                break
+
+        path = descend(exploration, get_random_int, tree, vectorized_select, solver)
+        selected_node = path[-1]
+
+        if solver and selected_node.get('proven') is not None and not selected_node['terminal']:
+            results = [proven_winner(path)] * rollouts_per_leaf
+            backprop_results_in_place(results, path, -1)
+            update_proofs(check_win, path)
+            done += 1
+            continue
+
+        unexplored_move = pop_untried_move(get_random_int, selected_node)
+        # If selection picks a terminal state, unexplored move will be None.
+        # Don't expand the selected node in this case (there is nothing to expand with!)
+        if unexplored_move is not None and table is not None:
+            path.append(expand_with_transpositions(get_valid_moves,
+                                                   is_terminal,
+                                                   apply_move,
+                                                   get_state_key,
+                                                   table,
+                                                   selected_node,
+                                                   unexplored_move))
+        elif unexplored_move is not None:
+            path.append(expand_in_place(get_valid_moves,
+                                        is_terminal,
+                                        apply_move,
+                                        selected_node,
+                                        unexplored_move))
+
+        # Simulate handles terminal nodes
+        results = simulate_many(is_terminal,
+                                check_win,
+                                get_valid_moves,
+                                get_random_int,
+                                apply_move,
+                                path[-1]['state'],
+                                rollouts_per_leaf,
+                                batch_rollout,
+                                known_result,
+                                rollout_policy)
+        # The root node's score is not actually used, but we
+        # backprop up to it and update it anyway.
+        # We don't know the previous state, especially for the case
+        # that the root node is the start of the game i.e. there
+        # was not previous state
+        backprop_results_in_place(results, path, -1)
+
+        if solver:
+            update_proofs(check_win, path)
+
+        done += 1
+
+    return { 'iterations': done,
+             'elapsed_ms': (monotonic() - started) * 1000,
+             'stopped_early': stopped_early,
+             'solved': solver and tree.get('proven') is not None }
+
+'''
+  Splits 'computation_budget' iterations as evenly as possible between
+  'workers', e.g. split_budget(10, 3) = [4, 3, 3]
+'''
+def split_budget(computation_budget, workers):
+    # type: (int | None, int) -> list[int | None]
+    if computation_budget is None:
+        return [None] * workers
+
+    return [computation_budget // workers + (1 if i < computation_budget % workers else 0)
+            for i in range(workers)]
+
+'''
+  Entry point for the worker processes of root parallelisation.
+  Runs an independent search from 'state' with its own seeded random number
+  generator and returns the statistics of the root's children, along with the
+  search's report.
+  'deadline' is on the monotonic clock, which is shared by all the processes
+  on the machine, so the parent can set one deadline for all the workers that
+  also covers the time taken to hand the search over to them.
+'''
+def search_root_children(settings, state, iterations, worker_seed, deadline=None, early_stop=False):
+    # type: (SearchSettings, State, int | None, int, float | None, bool) -> dict
+    rng = Random(worker_seed)
+    tree = make_root(state)
+    report = grow_tree(settings,
+                       lambda: rng.randint(0, maxsize),
+                       tree,
+                       iterations,
+                       make_search_table(settings),
+                       deadline,
+                       early_stop)
+
+    return { 'children': [{ 'move': child['move'],
+                            'num_rollouts': child['num_rollouts'],
+                            'score': child['score'],
+                            'proven': child.get('proven') } for child in tree['moves']],
+             'report': report }
+
+'''
+  Sums the statistics of the root children found by each worker, by move.
+  Moves are kept in the order they were first seen.
+'''
+def merge_root_children(children_per_worker):
+    # type: (list[list[dict]]) -> list[dict]
+    merged = {} # type: dict
+
+    for children in children_per_worker:
+        for child in children:
+            if child['move'] in merged:
+                merged[child['move']]['num_rollouts'] += child['num_rollouts']
+                merged[child['move']]['score'] += child['score']
+
+                # Proofs are exact, so any worker's proof holds for all of them
+                if child.get('proven') is not None:
+                    merged[child['move']]['proven'] = child['proven']
+            else:
+                merged[child['move']] = { **child }
+
+    return list(merged.values())
+
+class RootStatistics(TypedDict):
+    moves: List[Move]
+    visits: List[int]
+    mean_values: List[float]
+    policy: npt.NDArray[np.float64]
+
+'''
+  Statistics of the root's children, e.g. as training targets:
+    - visits and mean_values (score / visits, for the player to move at the
+      root, between -1 and 1) in the order of 'moves'
+    - policy: the visit counts raised to the power 1 / temperature and
+      normalised. Temperature 0 puts all the weight on the most visited move(s).
+      If move_to_index is given, policy has 'policy_size' entries with each
+      move's probability at move_to_index(move) (e.g. its board square) and 0
+      for moves that weren't searched; otherwise it follows 'moves'.
+'''
+def get_root_statistics(children, temperature, move_to_index=None, policy_size=None):
+    # type: (list[Node], float, Callable[[Move], int] | None, int | None) -> RootStatistics
+    visits = np.array([child['num_rollouts'] for child in children], dtype=np.float64)
+    scores = np.array([child['score'] for child in children], dtype=np.float64)
+
+    if temperature == 0:
+        weights = (visits == visits.max()).astype(np.float64)
+    else:
+        # Scaling by the maximum first keeps small temperatures from overflowing
+        weights = (visits / visits.max()) ** (1 / temperature)
+
+    distribution = weights / weights.sum()
+
+    if move_to_index is None:
+        policy = distribution
+    else:
+        policy = np.zeros(policy_size, dtype=np.float64)
+        policy[[move_to_index(child['move']) for child in children]] = distribution
+
+    return { 'moves': [child['move'] for child in children],
+             'visits': [child['num_rollouts'] for child in children],
+             'mean_values': np.divide(scores,
+                                      visits,
+                                      out=np.zeros_like(scores),
+                                      where=visits > 0).tolist(),
+             'policy': policy }
+
+'''
+  Tree reuse: 'previous_choice' is the node of the move picked by the previous
+  search. If 'state' is one of its children (i.e. it is the opponent's reply),
+  that subtree is returned to be used as the new root, keeping all the work
+  already done on it. Otherwise returns None.
+  previous_choice itself also matches, for when the agent is asked to play the
+  next move too (e.g. self-play with a single agent).
+  States are compared with get_state_key, if given, or ==
+'''
+def find_subtree(previous_choice, state, get_state_key):
+    # type: (Node | None, State, Callable[[State], Hashable] | None) -> Node | None
+    if previous_choice is None:
+        return None
+
+    key = state if get_state_key is None else get_state_key(state)
+
+    for node in [previous_choice] + previous_choice['moves']:
+        if key == (node['state'] if get_state_key is None else get_state_key(node['state'])):
+            return node
+
+    return None
+
+'''
+  workers > 1 enables root parallelisation: 'workers' independent searches are
+  run from the same root state in a process pool, each with a share of
+  'computation_budget'. Their root children statistics are merged before the
+  robust child is picked.
+  For this the game functions must be picklable (i.e. top-level functions) and
+  moves must be hashable. The pool is started by the first search (so that
+  move can overrun a time budget) and kept for the following ones; call the
+  agent's close() to shut it down.
+  rollouts_per_leaf > 1 enables leaf parallelisation: every iteration runs that
+  many playouts from the expanded node, and backpropagates all of their results
+  at once. Note that the visit counts then go up by rollouts_per_leaf per
+  iteration.
+  batch_rollout replaces those playouts with one call to a batched
+  implementation, see simulate_many().
+  get_state_key enables a transposition table of up to transposition_table_size
+  nodes, see expand_with_transpositions(). It must map equal states to the same
+  hashable key.
+  reuse_tree keeps the tree between calls: the subtree of the opponent's reply
+  to our last move becomes the new root, see find_subtree(). Only for workers = 1
+  (root parallelisation doesn't keep a tree).
+  time_budget_ms limits each search by wall-clock time instead of (or as well
+  as) computation_budget, which can be None when a time budget is given (but
+  not both) and otherwise must be at least 1. The time budget covers the whole
+  move, including starting the workers of root parallelisation. Each search runs at least one iteration, however short the time
+  budget.
+  early_stop ends a search once the most visited root move can no longer be
+  overtaken in the remaining budget.
+  report, if given, is called with the SearchReport of each search (with root
+  parallelisation: total iterations of all the workers).
+  solver enables MCTS-Solver, which proves wins, losses and draws as they are
+  found, stops searching once the root is proven and plays proven wins, see
+  prove_from_children().
+  return_root_statistics makes the agent return (move, RootStatistics) instead
+  of just the move, with the policy computed using 'temperature',
+  'move_to_index' and 'policy_size', see get_root_statistics().
+  known_result replaces the playouts from states whose result is already
+  known (e.g. from a tablebase) with that result, see simulate_many().
+  rollout_policy picks the moves of the playouts instead of uniformly random
+  moves, see simulate(). It takes the state and a function returning random
+  ints (e.g. tictactoe.policies.decisive_move).
+'''
 def make_mcts_agent(exploration,
                     get_valid_moves,
                     is_terminal,
                     apply_move,
                     check_win,
-                    computation_budget):
-    # type: (float, Callable[[State], list[Move]], Callable[[State], bool], Callable[[State, Move], State], Callable[[State], int | None], int) -> Callable[[State], Move]
+                    computation_budget,
+                    vectorized_select=False,
+                    workers=1,
+                    rollouts_per_leaf=1,
+                    batch_rollout=None,
+                    get_state_key=None,
+                    transposition_table_size=100000,
+                    reuse_tree=False,
+                    time_budget_ms=None,
+                    early_stop=False,
+                    report=None,
+                    solver=False,
+                    return_root_statistics=False,
+                    temperature=1.0,
+                    move_to_index=None,
+                    policy_size=None,
+                    known_result=None,
+                    rollout_policy=None):
+    # type: (float, Callable[[State], list[Move]], Callable[[State], bool], Callable[[State, Move], State], Callable[[State], int | None], int | None, bool, int, int, Callable[[State, int, Callable[[], int]], list[int | None]] | None, Callable[[State], Hashable] | None, int, bool, float | None, bool, Callable[[SearchReport], None] | None, bool, bool, float, Callable[[Move], int] | None, int | None, Callable[[State], tuple[bool, int | None]] | None, Callable[[State, Callable[[], int]], Move] | None) -> Callable[[State], Move | tuple[Move, RootStatistics]]
+    if computation_budget is None and time_budget_ms is None:
+        raise ValueError('MCTS needs a computation_budget, a time_budget_ms or both')
+    if computation_budget is not None and computation_budget < 1:
+        raise ValueError(f'computation_budget must be at least 1, not {computation_budget}')
+
+    settings = make_search_settings(exploration,
+                                    get_valid_moves,
+                                    is_terminal,
+                                    apply_move,
+                                    check_win,
+                                    vectorized_select=vectorized_select,
+                                    rollouts_per_leaf=rollouts_per_leaf,
+                                    batch_rollout=batch_rollout,
+                                    get_state_key=get_state_key,
+                                    transposition_table_size=transposition_table_size,
+                                    solver=solver,
+                                    known_result=known_result,
+                                    rollout_policy=rollout_policy)
+
+    # Only used when reuse_tree is set
+    previous_choice = None # type: Node | None
+    # Only used when workers > 1
+    executor = None # type: ProcessPoolExecutor | None
+
     def get_random_int():
         # type: () -> int
         return randint(0, maxsize)
 
+    def respond(children, choice):
+        # type: (list[Node], Node) -> Move | tuple[Move, RootStatistics]
+        if not return_root_statistics:
+            return choice['move']
+
+        return choice['move'], get_root_statistics(children,
+                                                   temperature,
+                                                   move_to_index,
+                                                   policy_size)
+
+    def close():
+        # type: () -> None
+        nonlocal executor
+
+        if executor is not None:
+            executor.shutdown()
+            executor = None
+
     def mcts(state):
-        # type: (State) -> Move
-        tree = { 'state': state,
-                 'num_rollouts': 0,
-                 'score': 0,
-                 'moves': [] }
-
-        for _ in range(computation_budget):
-            selected_node_path = select(exploration,
-                                        get_random_int,
-                                        get_valid_moves,
-                                        is_terminal,
-                                        tree)
-            selected_node = treewalk(selected_node_path, tree)
-            unexplored_move = pick_unexplored_move(get_random_int,
-                                                   get_valid_moves,
-                                                   is_terminal,
-                                                   selected_node)
-            # If selection picks a terminal state, unexplored move will be None.
-            # Don't expand the selected node in this case (there is nothing to expand with!)
-            path = selected_node_path + [unexplored_move] if unexplored_move else selected_node_path
-            # Is there a way to do this functionally in Python??
-            # Don't see any way without creating a function for this...
-            new_tree = tree
-            if unexplored_move:
-                unexplored_node = { 'move': unexplored_move,
-                                    'state': apply_move(selected_node['state'],
-                                                        unexplored_move),
-                                    'num_rollouts': 0,
-                                    'score': 0,
-                                    'moves': [] }
-                expanded_node = {
-                    **selected_node,
-                    'moves': selected_node['moves'] + [unexplored_node]
-                }
-
-                new_tree = replace_node(tree, selected_node_path, expanded_node)
-
-            # Simulate handles terminal nodes
-            result = simulate(is_terminal,
-                              check_win,
-                              get_valid_moves,
-                              get_random_int,
-                              apply_move,
-                              treewalk(path, new_tree)['state'])
-            # The root node's score is not actually used, but we
-            # backprop up to it and update it anyway.
-            # We don't know the previous state, especially for the case
-            # that the root node is the start of the game i.e. there
-            # was not previous state
-            tree = backprop(result, path, new_tree, -1)
-
-        # https://ai.stackexchange.com/questions/16905/mcts-how-to-choose-the-final-action-from-the-root
-        # Choose best move via the "robust child" method = highest # of visits
-        # Tie-break strategy: random choice
-        max_rollouts = reduce(
-                        lambda most_visited, current_node:
-                            most_visited + [current_node] if
-                                current_node['num_rollouts'] == most_visited[0]['num_rollouts']
-                            else [current_node] if
-                                current_node['num_rollouts'] > most_visited[0]['num_rollouts']
-                            else most_visited,
-                        tree['moves'][1:],
-                        [tree['moves'][0]])
-
-        # There is a possibility that multiple moves may have the same statistics;
-        # i.e. having the same number of rollouts.
-        # Settle the tie-break
-        next_node = max_rollouts[randint(0, len(max_rollouts) - 1)]
-
-        return next_node['move']
+        # type: (State) -> Move | tuple[Move, RootStatistics]
+        nonlocal previous_choice, executor
+        started = monotonic()
+        # For the whole move, including handing the search over to the workers
+        deadline = None if time_budget_ms is None else started + time_budget_ms / 1000
+
+        if workers <= 1:
+            subtree = find_subtree(previous_choice, state, get_state_key) if reuse_tree else None
+            table = (rebuild_search_table(settings, subtree) if subtree is not None
+                     else make_search_table(settings))
+            tree = subtree if subtree is not None else make_root(state)
+            search_report = grow_tree(settings,
+                                      get_random_int,
+                                      tree,
+                                      computation_budget,
+                                      table,
+                                      deadline,
+                                      early_stop)
+            choice = (pick_solver_child if solver else pick_robust_child)(tree['moves'])
+
+            if reuse_tree:
+                previous_choice = choice
+
+            if report is not None:
+                report(search_report)
+
+            return respond(tree['moves'], choice)
+
+        budgets = list(filter(lambda budget: budget is None or budget > 0,
+                              split_budget(computation_budget, workers)))
+        # Seeds are drawn from the global generator so that seeding it still
+        # makes the whole search reproducible
+        worker_seeds = [get_random_int() for _ in budgets]
+
+        if executor is None:
+            executor = ProcessPoolExecutor(max_workers=workers)
+
+        results = list(executor.map(search_root_children,
+                                    [settings] * len(budgets),
+                                    [state] * len(budgets),
+                                    budgets,
+                                    worker_seeds,
+                                    [deadline] * len(budgets),
+                                    [early_stop] * len(budgets)))
+
+        if report is not None:
+            report({ 'iterations': sum(map(lambda result: result['report']['iterations'],
+                                           results)),
+                     'elapsed_ms': (monotonic() - started) * 1000,
+                     'stopped_early': any(map(lambda result: result['report']['stopped_early'],
+                                              results)),
+                     'solved': any(map(lambda result: result['report']['solved'], results)) })
+
+        children = merge_root_children(list(map(lambda result: result['children'], results)))
+
+        return respond(children, (pick_solver_child if solver else pick_robust_child)(children))
+
+    mcts.close = close # type: ignore[attr-defined]
 
     return mcts
@@ -0,0 +1,214 @@
+from typing import TypedDict, List, Callable
+from random import randint
+from sys import maxsize
+import numpy as np
+import numpy.typing as npt
+from .mcts import State, Move, simulate, pick_max_uct
+
+
+NO_NODE = -1
+
+'''
+  Structure-of-arrays version of the MCTS tree.
+  Node i is described by the i-th entry of each array, instead of by its own
+  dict. The children of a node are allocated in one contiguous block starting at
+  first_child[i], so all of them can be scored with one vectorised computation.
+  A child's state is only created when the child is visited for the first time;
+  until then state[i] = NO_NODE.
+  Assumes that moves are integers. They are stored in an int64 array, which
+  switches to an object array the first time a move doesn't fit in 64 bits
+  (e.g. the single-bit moves of a large m,n,k-game board).
+'''
+class NodeStore(TypedDict):
+    size: int
+    parent: npt.NDArray[np.int64]
+    first_child: npt.NDArray[np.int64]
+    num_children: npt.NDArray[np.int64]
+    move: npt.NDArray[np.int64] # or dtype=object, see fits_in_int64()
+    num_rollouts: npt.NDArray[np.int64]
+    score: npt.NDArray[np.int64]
+    state: npt.NDArray[np.int64] # index into 'states'
+    states: List[State]
+
+ARRAY_FIELDS = ['parent',
+                'first_child',
+                'num_children',
+                'move',
+                'num_rollouts',
+                'score',
+                'state']
+
+def make_node_store(capacity):
+    # type: (int) -> NodeStore
+    return { 'size': 0,
+             'parent': np.full(capacity, NO_NODE, dtype=np.int64),
+             'first_child': np.full(capacity, NO_NODE, dtype=np.int64),
+             'num_children': np.zeros(capacity, dtype=np.int64),
+             'move': np.zeros(capacity, dtype=np.int64),
+             'num_rollouts': np.zeros(capacity, dtype=np.int64),
+             'score': np.zeros(capacity, dtype=np.int64),
+             'state': np.full(capacity, NO_NODE, dtype=np.int64),
+             'states': [] }
+
+# Doubles the capacity of every array, keeping the existing nodes
+def grow_node_store(store):
+    # type: (NodeStore) -> NodeStore
+    extra = make_node_store(len(store['parent']))
+
+    for field in ARRAY_FIELDS:
+        store[field] = np.concatenate((store[field], extra[field]))
+
+    return store
+
+def add_root(store, state):
+    # type: (NodeStore, State) -> int
+    if store['size'] >= len(store['parent']):
+        grow_node_store(store)
+
+    root = store['size']
+    store['states'].append(state)
+    store['state'][root] = len(store['states']) - 1
+    store['size'] = root + 1
+
+    return root
+
+INT64_MIN = int(np.iinfo(np.int64).min)
+INT64_MAX = int(np.iinfo(np.int64).max)
+
+def fits_in_int64(moves):
+    # type: (list[int]) -> bool
+    return all(INT64_MIN <= move <= INT64_MAX for move in moves)
+
+'''
+  Allocates one child per move in a single contiguous block.
+  Terminal states get an empty block, which also marks the node as expanded.
+'''
+def expand_children(get_valid_moves, is_terminal, store, node):
+    # type: (Callable[[State], list[Move]], Callable[[State], bool], NodeStore, int) -> None
+    state = store['states'][store['state'][node]]
+    moves = [] if is_terminal(state) else get_valid_moves(state)
+    first = store['size']
+
+    while first + len(moves) > len(store['parent']):
+        grow_node_store(store)
+
+    if store['move'].dtype != object and not fits_in_int64(moves):
+        store['move'] = store['move'].astype(object)
+
+    end = first + len(moves)
+    store['parent'][first:end] = node
+    store['move'][first:end] = moves
+    store['first_child'][node] = first
+    store['num_children'][node] = len(moves)
+    store['size'] = end
+
+def materialise_state(apply_move, store, node):
+    # type: (Callable[[State, Move], State], NodeStore, int) -> State
+    parent_state = store['states'][store['state'][store['parent'][node]]]
+    state = apply_move(parent_state, int(store['move'][node]))
+    store['states'].append(state)
+    store['state'][node] = len(store['states']) - 1
+
+    return state
+
+'''
+  Scores every child of 'node' with one vectorised UCT computation.
+  Unvisited children get a UCT value of infinity, so while any remain, one of
+  them is picked at random, just like pick_unexplored_move() in mcts.py.
+'''
+def select_child(exploration, get_random_int, store, node):
+    # type: (float, Callable[[], int], NodeStore, int) -> int
+    first = store['first_child'][node]
+    end = first + store['num_children'][node]
+
+    return int(first + pick_max_uct(exploration,
+                                    get_random_int,
+                                    store['num_rollouts'][node],
+                                    store['num_rollouts'][first:end],
+                                    store['score'][first:end]))
+
+'''
+  Returns the indices of the nodes from the root down to the node to simulate
+  from. Expansion happens on the way down: the first time a node is reached its
+  children are allocated, and descent stops at the first unvisited child.
+'''
+def select_and_expand(exploration,
+                      get_random_int,
+                      get_valid_moves,
+                      is_terminal,
+                      apply_move,
+                      store,
+                      root):
+    # type: (float, Callable[[], int], Callable[[State], list[Move]], Callable[[State], bool], Callable[[State, Move], State], NodeStore, int) -> list[int]
+    node = root
+    path = [root]
+
+    while True:
+        if store['first_child'][node] == NO_NODE:
+            expand_children(get_valid_moves, is_terminal, store, node)
+
+        # Terminal state; nothing to descend into
+        if store['num_children'][node] == 0:
+            return path
+
+        node = select_child(exploration, get_random_int, store, node)
+        path.append(node)
+
+        if store['num_rollouts'][node] == 0:
+            materialise_state(apply_move, store, node)
+            return path
+
+def backprop_path(who_won, store, path, previous_player):
+    # type: (int | None, NodeStore, list[int], int) -> None
+    rewards = []
+
+    for node in path:
+        rewards.append(1 if who_won == previous_player else
+                       0 if who_won is None else -1)
+        previous_player = store['states'][store['state'][node]]['player_to_move']
+
+    store['num_rollouts'][path] += 1
+    store['score'][path] += rewards
+
+def make_array_mcts_agent(exploration,
+                          get_valid_moves,
+                          is_terminal,
+                          apply_move,
+                          check_win,
+                          computation_budget,
+                          initial_capacity=1024):
+    # type: (float, Callable[[State], list[Move]], Callable[[State], bool], Callable[[State, Move], State], Callable[[State], int | None], int, int) -> Callable[[State], Move]
+    def get_random_int():
+        # type: () -> int
+        return randint(0, maxsize)
+
+    def mcts(state):
+        # type: (State) -> Move
+        store = make_node_store(initial_capacity)
+        root = add_root(store, state)
+
+        for _ in range(computation_budget):
+            path = select_and_expand(exploration,
+                                     get_random_int,
+                                     get_valid_moves,
+                                     is_terminal,
+                                     apply_move,
+                                     store,
+                                     root)
+            result = simulate(is_terminal,
+                              check_win,
+                              get_valid_moves,
+                              get_random_int,
+                              apply_move,
+                              store['states'][store['state'][path[-1]]])
+            backprop_path(result, store, path, -1)
+
+        # Choose best move via the "robust child" method = highest # of visits
+        # Tie-break strategy: random choice
+        first = store['first_child'][root]
+        num_rollouts = store['num_rollouts'][first:first + store['num_children'][root]]
+        most_visited = np.flatnonzero(num_rollouts == num_rollouts.max())
+
+        return int(store['move'][first + most_visited[randint(0, len(most_visited) - 1)]])
+
+    return mcts
@@ -0,0 +1,166 @@
+from typing import Callable
+from operator import itemgetter
+from random import randint, Random
+from sys import maxsize
+from threading import Lock, Thread
+from .mcts import (
+    State,
+    Move,
+    Node,
+    SearchSettings,
+    cache_moves,
+    descend,
+    pop_untried_move,
+    expand_in_place,
+    simulate_many,
+    backprop_results_in_place,
+    pick_robust_child,
+    make_root,
+    make_search_settings
+)
+
+
+'''
+  Tree parallelisation: several threads descend one shared tree.
+  Each thread adds a "virtual loss" to every node on its path while it runs its
+  simulation, making those nodes look worse to the other threads so that they
+  spread out over the tree instead of all following the same line.
+  The virtual loss is taken off again when the real result is backpropagated.
+
+  All reads and writes of the tree statistics happen while holding one lock;
+  only the simulation runs outside of it.
+  Note: in CPython the GIL serialises pure-Python simulations, so with the
+  default playouts this gives no speed-up over a single thread. Only
+  simulations that release the GIL run in parallel, e.g. a NumPy
+  'batch_rollout' (with rollouts_per_leaf > 1 to make the batches worth it),
+  see make_tree_parallel_mcts_agent().
+'''
+
+'''
+  Counts as 'virtual_loss' lost visits for the player that moved into each node
+'''
+def apply_virtual_loss(path, virtual_loss):
+    # type: (list[Node], int) -> None
+    for node in path:
+        node['num_rollouts'] += virtual_loss
+        node['score'] -= virtual_loss
+
+def revert_virtual_loss(path, virtual_loss):
+    # type: (list[Node], int) -> None
+    for node in path:
+        node['num_rollouts'] -= virtual_loss
+        node['score'] += virtual_loss
+
+def grow_tree_in_parallel(settings, tree, iterations, num_threads, virtual_loss):
+    # type: (SearchSettings, Node, int, int, int) -> Node
+    (exploration, get_valid_moves, is_terminal, apply_move, check_win, vectorized_select,
+     rollouts_per_leaf, batch_rollout, known_result,
+     rollout_policy) = itemgetter('exploration',
+                                  'get_valid_moves',
+                                  'is_terminal',
+                                  'apply_move',
+                                  'check_win',
+                                  'vectorized_select',
+                                  'rollouts_per_leaf',
+                                  'batch_rollout',
+                                  'known_result',
+                                  'rollout_policy')(settings)
+    if 'terminal' not in tree:
+        cache_moves(get_valid_moves, is_terminal, tree)
+
+    lock = Lock()
+    remaining = [iterations] # list so that the threads can share the counter
+
+    def worker(rng):
+        # type: (Random) -> None
+        def get_random_int():
+            # type: () -> int
+            return rng.randint(0, maxsize)
+
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+
+                path = descend(exploration, get_random_int, tree, vectorized_select)
+                selected_node = path[-1]
+                unexplored_move = pop_untried_move(get_random_int, selected_node)
+
+                if unexplored_move is not None:
+                    path.append(expand_in_place(get_valid_moves,
+                                                is_terminal,
+                                                apply_move,
+                                                selected_node,
+                                                unexplored_move))
+
+                apply_virtual_loss(path, virtual_loss)
+
+            results = simulate_many(is_terminal,
+                                    check_win,
+                                    get_valid_moves,
+                                    get_random_int,
+                                    apply_move,
+                                    path[-1]['state'],
+                                    rollouts_per_leaf,
+                                    batch_rollout,
+                                    known_result,
+                                    rollout_policy)
+
+            with lock:
+                revert_virtual_loss(path, virtual_loss)
+                backprop_results_in_place(results, path, -1)
+
+    # Seeds are drawn from the global generator so that seeding it still
+    # seeds every thread
+    threads = [Thread(target=worker, args=(Random(randint(0, maxsize)),))
+               for _ in range(num_threads)]
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return tree
+
+'''
+  rollouts_per_leaf, batch_rollout, known_result and rollout_policy work as in
+  make_mcts_agent(); the simulations they replace are what each thread runs
+  outside of the lock.
+'''
+def make_tree_parallel_mcts_agent(exploration,
+                                  get_valid_moves,
+                                  is_terminal,
+                                  apply_move,
+                                  check_win,
+                                  computation_budget,
+                                  num_threads=4,
+                                  virtual_loss=1,
+                                  vectorized_select=False,
+                                  rollouts_per_leaf=1,
+                                  batch_rollout=None,
+                                  known_result=None,
+                                  rollout_policy=None):
+    # type: (float, Callable[[State], list[Move]], Callable[[State], bool], Callable[[State, Move], State], Callable[[State], int | None], int, int, int, bool, int, Callable[[State, int, Callable[[], int]], list[int | None]] | None, Callable[[State], tuple[bool, int | None]] | None, Callable[[State, Callable[[], int]], Move] | None) -> Callable[[State], Move]
+    settings = make_search_settings(exploration,
+                                    get_valid_moves,
+                                    is_terminal,
+                                    apply_move,
+                                    check_win,
+                                    vectorized_select=vectorized_select,
+                                    rollouts_per_leaf=rollouts_per_leaf,
+                                    batch_rollout=batch_rollout,
+                                    known_result=known_result,
+                                    rollout_policy=rollout_policy)
+
+    def mcts(state):
+        # type: (State) -> Move
+        tree = grow_tree_in_parallel(settings,
+                                     make_root(state),
+                                     computation_budget,
+                                     num_threads,
+                                     virtual_loss)
+
+        return pick_robust_child(tree['moves'])['move']
+
+    return mcts
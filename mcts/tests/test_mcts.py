@@ -1,9 +1,14 @@
 from math import inf, exp
+import numpy as np
+import pytest
 from functools import reduce
 from random import seed, randint
+from time import monotonic
 from sys import maxsize
+from typing import Callable
 from mcts.mcts import (
     uct,
+    Node,
     pick_best_move,
     State,
     Move,
@@ -13,9 +18,57 @@ from mcts.mcts import (
     replace_node,
     simulate,
     is_path_valid,
-    backprop
+    backprop,
+    expand_in_place,
+    pick_robust_child,
+    make_mcts_agent,
+    uct_array,
+    pick_max_uct,
+    split_budget,
+    simulate_many,
+    backprop_results_in_place,
+    expand_with_transpositions,
+    find_subtree,
+    search_root_children,
+    merge_root_children,
+    estimate_remaining_iterations,
+    is_root_decided,
+    grow_tree,
+    make_root,
+    make_search_settings,
+    rebuild_search_table,
+    DEFAULT_SEARCH_OPTIONS,
+    get_root_statistics,
+    cache_moves,
+    pop_untried_move,
+    pick_child,
+    descend,
+    node_bounds,
+    prove_from_children,
+    update_proofs,
+    proven_winner,
+    pick_solver_child
 )
+from mcts.transposition import make_transposition_table
+from tictactoe.engine import (
+    get_valid_moves_list,
+    is_terminal,
+    apply_move_to_state,
+    check_win
+)
+
 
+search_settings = make_search_settings(1.2,
+                                       get_valid_moves_list,
+                                       is_terminal,
+                                       apply_move_to_state,
+                                       check_win)
+solver_settings = make_search_settings(1.2,
+                                       get_valid_moves_list,
+                                       is_terminal,
+                                       apply_move_to_state,
+                                       check_win,
+                                       solver=True)
 
 def test_uct():
     assert 2.5 == uct(1, # Exploration parameter
@@ -23,6 +76,23 @@ def test_uct():
                       { 'num_rollouts': 2, 'score': 1 }) # Node statistics
     assert inf == uct(1, exp(8), { 'num_rollouts': 0, 'score': 0 })
 
+def test_uct_array():
+    ucts = uct_array(1, exp(8), np.array([2, 0, 2]), np.array([1, 0, -1]))
+
+    assert 2.5 == ucts[0]
+    assert inf == ucts[1]
+    assert 1.5 == ucts[2]
+    # Root node that hasn't been visited yet
+    assert [inf, inf] == list(uct_array(1, 0, np.array([0, 0]), np.array([0, 0])))
+
+def test_pick_max_uct():
+    assert 1 == pick_max_uct(1.5, lambda: 0, 8, np.array([4, 2, 2]), np.array([0, 2, 1]))
+    # Unvisited child always wins
+    assert 2 == pick_max_uct(1.5, lambda: 0, 8, np.array([4, 4, 0]), np.array([4, 4, 0]))
+    # Tie-break between identical statistics
+    assert 0 == pick_max_uct(1.5, lambda: 2, 3, np.array([1, 1, 1]), np.array([1, 0, 1]))
+    assert 2 == pick_max_uct(1.5, lambda: 1, 3, np.array([1, 1, 1]), np.array([1, 0, 1]))
+
 def test_pick_best_move():
     assert 0 == pick_best_move(1.5, { 'moves': [{ 'num_rollouts': 2,
                                                   'score': 1 }]})
@@ -766,3 +836,879 @@ def test_backprop():
                                      'score': 1,
                                      'moves': []}]}]
     } == backprop(1, [0b100000000, 0b001000000], initial_state, 1)
+
+def test_expand_in_place():
+    def mock_apply_move(state, move): # type: (State, Move) -> State
+        return { 'board': [state['board'][0] | move, state['board'][1]],
+                 'player_to_move': 1 }
+
+    tree = { 'state': { 'board': [0b000000001, 0b000000010],
+                        'player_to_move': 0 },
+             'num_rollouts': 2,
+             'score': 0,
+             'moves': [] }
+    moves = tree['moves']
+
+    child = expand_in_place(lambda state: [0b000001000, 0b000010000],
+                            lambda state: False,
+                            mock_apply_move,
+                            tree,
+                            0b000000100)
+
+    assert { 'move': 0b000000100,
+             'state': { 'board': [0b000000101, 0b000000010],
+                        'player_to_move': 1 },
+             'num_rollouts': 0,
+             'score': 0,
+             'moves': [],
+             'terminal': False,
+             'untried_moves': [0b000001000, 0b000010000] } == child
+    assert moves is tree['moves']
+    assert [child] == tree['moves']
+
+def test_pick_robust_child():
+    assert 0b000000010 == pick_robust_child([{ 'move': 0b000000001, 'num_rollouts': 3 },
+                                             { 'move': 0b000000010, 'num_rollouts': 7 },
+                                             { 'move': 0b000000100, 'num_rollouts': 2 }])['move']
+
+    seed(123)
+    assert pick_robust_child([{ 'move': 0b000000001, 'num_rollouts': 3 },
+                              { 'move': 0b000000010, 'num_rollouts': 3 }])['move'] in [0b000000001,
+                                                                                        0b000000010]
+
+def test_make_mcts_agent():
+    seed(123)
+    agent = make_mcts_agent(1.2,
+                            get_valid_moves_list,
+                            is_terminal,
+                            apply_move_to_state,
+                            check_win,
+                            200)
+
+    # Player 0 can complete the top row
+    assert 0b100000000 == agent({ 'board': [0b011000000, 0b000000011],
+                                  'player_to_move': 0 })
+    # Player 1 has to block the top row
+    assert 0b100000000 == agent({ 'board': [0b011001000, 0b000100001],
+                                  'player_to_move': 1 })
+
+def test_make_mcts_agent_vectorized_select():
+    def play_moves(vectorized_select): # type: (bool) -> list[Move]
+        seed(42)
+        agent = make_mcts_agent(1.2,
+                                get_valid_moves_list,
+                                is_terminal,
+                                apply_move_to_state,
+                                check_win,
+                                100,
+                                vectorized_select)
+
+        return [agent({ 'board': [0, 0], 'player_to_move': 0 }) for _ in range(5)]
+
+    # Both selection paths consume the random numbers in the same way, so they
+    # should make the same choices for a fixed seed
+    assert play_moves(False) == play_moves(True)
+
+def test_split_budget():
+    assert [4, 3, 3] == split_budget(10, 3)
+    assert [5, 5] == split_budget(10, 2)
+    assert [1, 1, 0] == split_budget(2, 3)
+
+def test_search_root_children():
+    state = { 'board': [0b000010000, 0b000000001], 'player_to_move': 0 }
+
+    result = search_root_children(search_settings, state, 50, 7)
+    children = result['children']
+
+    assert 50 == result['report']['iterations']
+    assert 50 == sum(map(lambda child: child['num_rollouts'], children))
+    assert sorted(get_valid_moves_list(state)) == sorted(map(lambda child: child['move'],
+                                                            children))
+    # Each worker has its own seeded generator
+    assert children == search_root_children(search_settings, state, 50, 7)['children']
+    # The deadline is absolute: one that passed before the worker started still
+    # lets it run the one iteration every search runs
+    assert 1 == search_root_children(search_settings,
+                                     state,
+                                     None,
+                                     7,
+                                     deadline=monotonic() - 1)['report']['iterations']
+
+def test_merge_root_children():
+    assert [{ 'move': 0b000000001, 'num_rollouts': 5, 'score': 1 },
+            { 'move': 0b000000010, 'num_rollouts': 2, 'score': -1 },
+            { 'move': 0b000000100, 'num_rollouts': 1, 'score': 0 }] == merge_root_children([
+                [{ 'move': 0b000000001, 'num_rollouts': 3, 'score': 2 },
+                 { 'move': 0b000000010, 'num_rollouts': 2, 'score': -1 }],
+                [{ 'move': 0b000000100, 'num_rollouts': 1, 'score': 0 },
+                 { 'move': 0b000000001, 'num_rollouts': 2, 'score': -1 }]])
+
+def test_make_mcts_agent_workers():
+    seed(123)
+    agent = make_mcts_agent(1.2,
+                            get_valid_moves_list,
+                            is_terminal,
+                            apply_move_to_state,
+                            check_win,
+                            200,
+                            workers=2)
+
+    # Player 0 can complete the top row
+    assert 0b100000000 == agent({ 'board': [0b011000000, 0b000000011],
+                                  'player_to_move': 0 })
+    agent.close()
+
+def test_make_mcts_agent_workers_several_moves():
+    seed(123)
+    reports = []
+    agent = make_mcts_agent(1.2,
+                            get_valid_moves_list,
+                            is_terminal,
+                            apply_move_to_state,
+                            check_win,
+                            100,
+                            workers=2,
+                            report=reports.append)
+    state = { 'board': [0, 0], 'player_to_move': 0 }
+
+    # The same pool plays every move
+    for _ in range(3):
+        move = agent(state)
+
+        assert move in get_valid_moves_list(state)
+
+        state = apply_move_to_state(state, move)
+
+    assert [100] * 3 == [report['iterations'] for report in reports]
+
+    agent.close()
+    # Closing again is harmless, and a closed agent starts a new pool if used
+    agent.close()
+    assert agent(state) in get_valid_moves_list(state)
+    agent.close()
+
+def test_simulate_many():
+    seed(123)
+    results = simulate_many(is_terminal,
+                            check_win,
+                            get_valid_moves_list,
+                            lambda: randint(0, maxsize),
+                            apply_move_to_state,
+                            { 'board': [0b000010000, 0b000000001], 'player_to_move': 0 },
+                            20)
+
+    assert 20 == len(results)
+    assert set(results) <= {0, 1, None}
+    # Batched hook replaces the individual playouts
+    assert [1, None, 1] == simulate_many(is_terminal,
+                                         check_win,
+                                         get_valid_moves_list,
+                                         lambda: 4,
+                                         apply_move_to_state,
+                                         { 'board': [0, 0], 'player_to_move': 0 },
+                                         3,
+                                         lambda state, n, random_int:
+                                             [1, None, 1][:n] if random_int() == 4 else [])
+    # Terminal state
+    assert [0, 0, 0] == simulate_many(is_terminal,
+                                      check_win,
+                                      get_valid_moves_list,
+                                      lambda: randint(0, maxsize),
+                                      apply_move_to_state,
+                                      { 'board': [0b001001001, 0b000010010],
+                                        'player_to_move': 1 },
+                                      3)
+    # A known result replaces the playouts (and the batched hook)
+    assert [0, 0] == simulate_many(is_terminal,
+                                   check_win,
+                                   get_valid_moves_list,
+                                   lambda: randint(0, maxsize),
+                                   apply_move_to_state,
+                                   { 'board': [0, 0], 'player_to_move': 0 },
+                                   2,
+                                   lambda state, n, random_int: [1] * n,
+                                   lambda state: (True, 0))
+    # Unknown results are played out
+    assert [1, 1] == simulate_many(is_terminal,
+                                   check_win,
+                                   get_valid_moves_list,
+                                   lambda: randint(0, maxsize),
+                                   apply_move_to_state,
+                                   { 'board': [0, 0], 'player_to_move': 0 },
+                                   2,
+                                   lambda state, n, random_int: [1] * n,
+                                   lambda state: (False, None))
+
+def test_backprop_results_in_place():
+    leaf = { 'state': { 'board': [0b110000101, 0b001011010],
+                        'player_to_move': 0 },
+             'num_rollouts': 0,
+             'score': 0 }
+    middle = { 'state': { 'board': [0b110000101, 0b000011010],
+                          'player_to_move': 1 },
+               'num_rollouts': 2,
+               'score': 1 }
+    root = { 'state': { 'board': [0b010000101, 0b000011010],
+                        'player_to_move': 0 },
+             'num_rollouts': 4,
+             'score': 2 }
+
+    backprop_results_in_place([0, 0, None, 1], [root, middle, leaf], 1)
+
+    # Player 1 moved into root: 1 win, 2 losses
+    assert (8, 1) == (root['num_rollouts'], root['score'])
+    # Player 0 moved into middle: 2 wins, 1 loss
+    assert (6, 2) == (middle['num_rollouts'], middle['score'])
+    # Player 1 moved into leaf
+    assert (4, -1) == (leaf['num_rollouts'], leaf['score'])
+
+    # A single result
+    backprop_results_in_place([None], [root, middle, leaf], -1)
+
+    assert (9, 1) == (root['num_rollouts'], root['score'])
+
+def test_backprop_results_in_place_single_result():
+    leaf = { 'move': 0b001000000,
+             'state': { 'board': [0b110000101, 0b001011010],
+                        'player_to_move': 0 },
+             'num_rollouts': 0,
+             'score': 0,
+             'moves': [] }
+    middle = { 'move': 0b100000000,
+               'state': { 'board': [0b110000101, 0b000011010],
+                          'player_to_move': 1 },
+               'num_rollouts': 2,
+               'score': 1,
+               'moves': [leaf] }
+    root = { 'move': 0b000001000,
+             'state': { 'board': [0b010000101, 0b000011010],
+                        'player_to_move': 0 },
+             'num_rollouts': 4,
+             'score': 2,
+             'moves': [middle] }
+
+    # Same statistics as the first case of test_backprop()
+    backprop_results_in_place([0], [root, middle, leaf], 1)
+
+    assert (5, 1) == (root['num_rollouts'], root['score'])
+    assert (3, 2) == (middle['num_rollouts'], middle['score'])
+    assert (1, -1) == (leaf['num_rollouts'], leaf['score'])
+
+    backprop_results_in_place([None], [root, middle, leaf], 1)
+
+    assert (6, 1) == (root['num_rollouts'], root['score'])
+    assert (4, 2) == (middle['num_rollouts'], middle['score'])
+    assert (2, -1) == (leaf['num_rollouts'], leaf['score'])
+
+def test_make_mcts_agent_rollouts_per_leaf():
+    seed(123)
+    agent = make_mcts_agent(1.2,
+                            get_valid_moves_list,
+                            is_terminal,
+                            apply_move_to_state,
+                            check_win,
+                            60,
+                            rollouts_per_leaf=4)
+
+    # Player 1 has to block the top row
+    assert 0b100000000 == agent({ 'board': [0b011001000, 0b000100001],
+                                  'player_to_move': 1 })
+
+def board_key(state): # type: (State) -> tuple
+    return (tuple(state['board']), state['player_to_move'])
+
+def test_expand_with_transpositions():
+    table = make_transposition_table(10)
+    # Two move orders that reach the same state
+    left = { 'state': { 'board': [0b000000001, 0b000000010], 'player_to_move': 0 },
+             'num_rollouts': 0,
+             'score': 0,
+             'moves': [] }
+    right = { 'state': { 'board': [0b000000100, 0b000000010], 'player_to_move': 0 },
+              'num_rollouts': 0,
+              'score': 0,
+              'moves': [] }
+
+    left_child = expand_with_transpositions(get_valid_moves_list,
+                                            is_terminal,
+                                            apply_move_to_state,
+                                            board_key,
+                                            table,
+                                            left,
+                                            0b000000100)
+    right_child = expand_with_transpositions(get_valid_moves_list,
+                                             is_terminal,
+                                             apply_move_to_state,
+                                             board_key,
+                                             table,
+                                             right,
+                                             0b000000001)
+
+    assert { 'board': [0b000000101, 0b000000010],
+             'player_to_move': 1 } == right_child['state']
+    # Subtree is shared...
+    assert left_child['moves'] is right_child['moves']
+    assert left_child['untried_moves'] is right_child['untried_moves']
+    assert 6 == len(left_child['untried_moves'])
+    # ...but each edge keeps its own move and statistics
+    assert 0b000000100 == left_child['move']
+    assert 0b000000001 == right_child['move']
+    assert left_child is not right_child
+    assert [left_child] == left['moves']
+    assert [right_child] == right['moves']
+    assert 1 == len(table['entries'])
+    assert 1 == table['hits']
+
+def test_make_mcts_agent_transpositions():
+    seed(123)
+    agent = make_mcts_agent(1.2,
+                            get_valid_moves_list,
+                            is_terminal,
+                            apply_move_to_state,
+                            check_win,
+                            200,
+                            get_state_key=board_key,
+                            transposition_table_size=50)
+
+    # Player 0 can complete the top row
+    assert 0b100000000 == agent({ 'board': [0b011000000, 0b000000011],
+                                  'player_to_move': 0 })
+    # Player 1 has to block the top row
+    assert 0b100000000 == agent({ 'board': [0b011001000, 0b000100001],
+                                  'player_to_move': 1 })
+
+def test_find_subtree():
+    reply = { 'move': 0b000000010,
+              'state': { 'board': [0b000000001, 0b000000010], 'player_to_move': 0 },
+              'num_rollouts': 3,
+              'score': 1,
+              'moves': [] }
+    previous_choice = { 'move': 0b000000001,
+                        'state': { 'board': [0b000000001, 0], 'player_to_move': 1 },
+                        'num_rollouts': 5,
+                        'score': 2,
+                        'moves': [{ 'move': 0b000000100,
+                                    'state': { 'board': [0b000000001, 0b000000100],
+                                               'player_to_move': 0 },
+                                    'num_rollouts': 2,
+                                    'score': 1,
+                                    'moves': [] },
+                                  reply] }
+
+    assert reply is find_subtree(previous_choice,
+                                 { 'board': [0b000000001, 0b000000010], 'player_to_move': 0 },
+                                 None)
+    assert reply is find_subtree(previous_choice,
+                                 { 'board': [0b000000001, 0b000000010], 'player_to_move': 0 },
+                                 board_key)
+    # Asked to play the next move as well
+    assert previous_choice is find_subtree(previous_choice,
+                                           { 'board': [0b000000001, 0],
+                                             'player_to_move': 1 },
+                                           None)
+    # Reply that wasn't explored
+    assert None is find_subtree(previous_choice,
+                                { 'board': [0b000000001, 0b000001000], 'player_to_move': 0 },
+                                None)
+    # First move of the game
+    assert None is find_subtree(None, { 'board': [0, 0], 'player_to_move': 0 }, None)
+
+def test_rebuild_search_table():
+    seed(123)
+    settings = make_search_settings(1.2,
+                                    get_valid_moves_list,
+                                    is_terminal,
+                                    apply_move_to_state,
+                                    check_win,
+                                    get_state_key=board_key)
+    tree = make_root({ 'board': [0, 0], 'player_to_move': 0 })
+    table = make_transposition_table(100000)
+    grow_tree(settings, lambda: randint(0, maxsize), tree, 500, table)
+    subtree = pick_robust_child(tree['moves'])
+
+    def reachable_keys(node): # type: (Node) -> set
+        return { board_key(node['state']) }.union(*map(reachable_keys, node['moves']))
+
+    rebuilt = rebuild_search_table(settings, subtree)
+
+    assert reachable_keys(subtree) == set(rebuilt['entries'].keys())
+    assert len(rebuilt['entries']) < len(table['entries'])
+    assert subtree is rebuilt['entries'][board_key(subtree['state'])]
+    # Without a transposition table there is nothing to rebuild
+    assert None is rebuild_search_table(search_settings, subtree)
+
+def test_make_mcts_agent_reuse_tree():
+    seed(123)
+    agent = make_mcts_agent(1.2,
+                            get_valid_moves_list,
+                            is_terminal,
+                            apply_move_to_state,
+                            check_win,
+                            200,
+                            get_state_key=board_key,
+                            reuse_tree=True)
+    state = { 'board': [0, 0], 'player_to_move': 0 }
+
+    # Play out a whole game against itself, reusing the tree every move
+    while not is_terminal(state):
+        move = agent(state)
+
+        assert move in get_valid_moves_list(state)
+
+        state = apply_move_to_state(state, move)
+
+def test_estimate_remaining_iterations():
+    # Iteration budget only
+    assert 70 == estimate_remaining_iterations(30, 100, 0.0, 1.0, None)
+    # 30 iterations in 1s, 2s left
+    assert 60 == estimate_remaining_iterations(30, None, 0.0, 1.0, 3.0)
+    # Whichever runs out first
+    assert 20 == estimate_remaining_iterations(30, 50, 0.0, 1.0, 3.0)
+    # No rate to go by yet
+    assert inf == estimate_remaining_iterations(0, None, 0.0, 0.0, 3.0)
+
+def test_is_root_decided():
+    root = { 'moves': [{ 'num_rollouts': 10 }, { 'num_rollouts': 4 }] }
+
+    assert is_root_decided(root, 2, 5)
+    # A tie is still possible
+    assert not is_root_decided(root, 2, 6)
+    # Unexpanded moves count as unvisited
+    assert not is_root_decided({ 'moves': [{ 'num_rollouts': 3 }] }, 2, 3)
+    assert is_root_decided({ 'moves': [{ 'num_rollouts': 3 }] }, 2, 2)
+    # Single move, once it has been expanded
+    assert is_root_decided({ 'moves': [{ 'num_rollouts': 1 }] }, 1, 100)
+    assert not is_root_decided({ 'moves': [] }, 1, 100)
+
+def test_make_search_settings():
+    assert { 'exploration': 1.2,
+             'get_valid_moves': get_valid_moves_list,
+             'is_terminal': is_terminal,
+             'apply_move': apply_move_to_state,
+             'check_win': check_win,
+             **DEFAULT_SEARCH_OPTIONS } == search_settings
+    assert 8 == make_search_settings(1.2,
+                                     get_valid_moves_list,
+                                     is_terminal,
+                                     apply_move_to_state,
+                                     check_win,
+                                     rollouts_per_leaf=8)['rollouts_per_leaf']
+    assert solver_settings['solver']
+
+    with pytest.raises(TypeError, match='rollout_per_leaf'):
+        make_search_settings(1.2,
+                             get_valid_moves_list,
+                             is_terminal,
+                             apply_move_to_state,
+                             check_win,
+                             rollout_per_leaf=8)
+
+def test_grow_tree():
+    seed(123)
+    tree = make_root({ 'board': [0b000010000, 0b000000001], 'player_to_move': 0 })
+    report = grow_tree(search_settings, lambda: randint(0, maxsize), tree, 100)
+
+    assert 100 == report['iterations']
+    assert not report['stopped_early']
+    assert 100 == tree['num_rollouts']
+
+# The copy-on-write search loop that grow_tree() replaced
+def copy_on_write_search(get_random_int, state, iterations):
+    # type: (Callable[[], int], State, int) -> Node
+    tree = make_root(state)
+
+    for _ in range(iterations):
+        selected_node_path = select(1.2, get_random_int, get_valid_moves_list, is_terminal, tree)
+        selected_node = treewalk(selected_node_path, tree)
+        unexplored_move = pick_unexplored_move(get_random_int,
+                                               get_valid_moves_list,
+                                               is_terminal,
+                                               selected_node)
+        path = selected_node_path + [unexplored_move] if unexplored_move else selected_node_path
+        new_tree = tree
+
+        if unexplored_move:
+            new_tree = replace_node(tree,
+                                    selected_node_path,
+                                    { **selected_node,
+                                      'moves': selected_node['moves']
+                                               + [{ 'move': unexplored_move,
+                                                    'state': apply_move_to_state(
+                                                                selected_node['state'],
+                                                                unexplored_move),
+                                                    'num_rollouts': 0,
+                                                    'score': 0,
+                                                    'moves': [] }] })
+
+        result = simulate(is_terminal,
+                          check_win,
+                          get_valid_moves_list,
+                          get_random_int,
+                          apply_move_to_state,
+                          treewalk(path, new_tree)['state'])
+        tree = backprop(result, path, new_tree, -1)
+
+    return tree
+
+def test_grow_tree_matches_copy_on_write_search():
+    # The in-place tree visits children in a different order, so the exact
+    # searches differ for the same seed, but the distributions of the root
+    # visits and of the chosen moves must be the same. After X takes the
+    # centre, O's four corners are all good replies, so the choice varies.
+    state = { 'board': [0b000010000, 0], 'player_to_move': 1 }
+    moves = get_valid_moves_list(state)
+    num_searches = 200
+
+    def visit_shares(tree):
+        # type: (Node) -> np.ndarray
+        visits = { child['move']: child['num_rollouts'] for child in tree['moves'] }
+
+        return np.array([visits.get(move, 0) for move in moves]) / tree['num_rollouts']
+
+    seed(123)
+    copy_on_write = [copy_on_write_search(lambda: randint(0, maxsize), state, 100)
+                     for _ in range(num_searches)]
+    in_place = [make_root(state) for _ in range(num_searches)]
+    for tree in in_place:
+        grow_tree(search_settings, lambda: randint(0, maxsize), tree, 100)
+
+    assert np.allclose(np.mean([visit_shares(tree) for tree in copy_on_write], axis=0),
+                       np.mean([visit_shares(tree) for tree in in_place], axis=0),
+                       atol=0.03)
+
+    def choice_frequencies(trees):
+        # type: (list[Node]) -> np.ndarray
+        choices = [pick_robust_child(tree['moves'])['move'] for tree in trees]
+
+        return np.array([choices.count(move) for move in moves]) / len(trees)
+
+    assert np.allclose(choice_frequencies(copy_on_write), choice_frequencies(in_place), atol=0.1)
+
+def test_grow_tree_deadline():
+    seed(123)
+    tree = make_root({ 'board': [0, 0], 'player_to_move': 0 })
+    # Deadline already passed: stops at the first clock check, after one
+    # iteration so that there is a move to pick
+    report = grow_tree(search_settings, lambda: randint(0, maxsize), tree, None, deadline=0.0)
+
+    assert 1 == report['iterations']
+    assert 1 == len(tree['moves'])
+
+def test_grow_tree_early_stop():
+    seed(123)
+    # Only one move left: nothing to decide once it has been expanded
+    tree = make_root({ 'board': [0b010110001, 0b001001110], 'player_to_move': 0 })
+    report = grow_tree(search_settings,
+                       lambda: randint(0, maxsize),
+                       tree,
+                       1000,
+                       early_stop=True)
+
+    assert report['stopped_early']
+    assert report['iterations'] < 1000
+    assert 1 == len(tree['moves'])
+
+def test_make_mcts_agent_time_budget():
+    seed(123)
+    reports = []
+    agent = make_mcts_agent(1.2,
+                            get_valid_moves_list,
+                            is_terminal,
+                            apply_move_to_state,
+                            check_win,
+                            None,
+                            time_budget_ms=50,
+                            early_stop=True,
+                            report=reports.append)
+
+    # Player 0 can complete the top row
+    assert 0b100000000 == agent({ 'board': [0b011000000, 0b000000011],
+                                  'player_to_move': 0 })
+    assert 1 == len(reports)
+    assert reports[0]['iterations'] > 0
+
+def test_make_mcts_agent_tiny_time_budget():
+    seed(123)
+    state = { 'board': [0, 0], 'player_to_move': 0 }
+
+    for time_budget_ms in [0, 0.001]:
+        agent = make_mcts_agent(1.2,
+                                get_valid_moves_list,
+                                is_terminal,
+                                apply_move_to_state,
+                                check_win,
+                                None,
+                                time_budget_ms=time_budget_ms)
+
+        assert agent(state) in get_valid_moves_list(state)
+
+    for computation_budget in [None, 0, -5]:
+        with pytest.raises(ValueError):
+            make_mcts_agent(1.2,
+                            get_valid_moves_list,
+                            is_terminal,
+                            apply_move_to_state,
+                            check_win,
+                            computation_budget)
+
+def test_make_mcts_agent_workers_time_budget():
+    seed(123)
+    reports = []
+    agent = make_mcts_agent(1.2,
+                            get_valid_moves_list,
+                            is_terminal,
+                            apply_move_to_state,
+                            check_win,
+                            None,
+                            workers=2,
+                            time_budget_ms=50,
+                            report=reports.append)
+    state = { 'board': [0b011000000, 0b000000011], 'player_to_move': 0 }
+
+    # Player 0 can complete the top row
+    assert 0b100000000 == agent(state)
+    assert 0b100000000 == agent(state)
+    agent.close()
+
+    assert all(report['iterations'] >= 2 for report in reports)
+
+def test_get_root_statistics():
+    children = [{ 'move': 0b001, 'num_rollouts': 6, 'score': 3 },
+                { 'move': 0b100, 'num_rollouts': 2, 'score': -2 },
+                { 'move': 0b010, 'num_rollouts': 0, 'score': 0 }]
+    statistics = get_root_statistics(children, 1.0)
+
+    assert [0b001, 0b100, 0b010] == statistics['moves']
+    assert [6, 2, 0] == statistics['visits']
+    assert [0.5, -1.0, 0.0] == statistics['mean_values']
+    assert np.allclose([0.75, 0.25, 0], statistics['policy'])
+    # Sharper with a lower temperature
+    assert np.allclose([0.9, 0.1, 0], get_root_statistics(children, 0.5)['policy'])
+    assert np.allclose([1, 0, 0], get_root_statistics(children, 0)['policy'])
+    # Laid out by move index
+    assert np.allclose([0.75, 0, 0.25, 0],
+                       get_root_statistics(children,
+                                           1.0,
+                                           lambda move: move.bit_length() - 1,
+                                           4)['policy'])
+
+def test_make_mcts_agent_root_statistics():
+    seed(123)
+    agent = make_mcts_agent(1.2,
+                            get_valid_moves_list,
+                            is_terminal,
+                            apply_move_to_state,
+                            check_win,
+                            200,
+                            return_root_statistics=True,
+                            move_to_index=lambda move: move.bit_length() - 1,
+                            policy_size=9)
+    move, statistics = agent({ 'board': [0b011000000, 0b000000011],
+                               'player_to_move': 0 })
+
+    # Player 0 can complete the top row
+    assert 0b100000000 == move
+    assert 200 == sum(statistics['visits'])
+    assert 8 == np.argmax(statistics['policy'])
+    assert np.isclose(1, statistics['policy'].sum())
+    # Winning straight away every time
+    assert 1.0 == statistics['mean_values'][statistics['moves'].index(move)]
+
+def test_cache_moves():
+    node = cache_moves(get_valid_moves_list,
+                       is_terminal,
+                       { 'state': { 'board': [0b011000000, 0b000000011], 'player_to_move': 0 },
+                         'num_rollouts': 1,
+                         'score': 0,
+                         'moves': [{ 'move': 0b000000100 }] })
+
+    assert False is node['terminal']
+    # Moves with a child already are left out
+    assert [0b000001000, 0b000010000, 0b000100000, 0b100000000] == node['untried_moves']
+
+    terminal = cache_moves(get_valid_moves_list,
+                           is_terminal,
+                           { 'state': { 'board': [0b111000000, 0b000000011],
+                                        'player_to_move': 1 },
+                             'num_rollouts': 0,
+                             'score': 0,
+                             'moves': [] })
+
+    assert True is terminal['terminal']
+    assert [] == terminal['untried_moves']
+
+def test_pop_untried_move():
+    node = { 'untried_moves': [0b001, 0b010, 0b100] }
+
+    assert 0b010 == pop_untried_move(lambda: 4, node)
+    assert [0b001, 0b100] == node['untried_moves']
+    assert 0b001 == pop_untried_move(lambda: 0, node)
+    assert 0b100 == pop_untried_move(lambda: 0, node)
+    assert None is pop_untried_move(lambda: 0, node)
+
+def test_descend():
+    leaf = { 'num_rollouts': 1, 'score': 1, 'moves': [], 'terminal': True, 'untried_moves': [] }
+    child = { 'num_rollouts': 3,
+              'score': 1,
+              'moves': [leaf],
+              'terminal': False,
+              'untried_moves': [] }
+    other = { 'num_rollouts': 3,
+              'score': -3,
+              'moves': [],
+              'terminal': False,
+              'untried_moves': [0b1] }
+    tree = { 'num_rollouts': 6,
+             'score': 0,
+             'moves': [child, other],
+             'terminal': False,
+             'untried_moves': [] }
+
+    # Follows the best child down to a terminal node
+    assert [tree, child, leaf] == descend(1.0, lambda: 0, tree)
+    # Stops at a node that still has untried moves
+    other['score'] = 3
+    assert [tree, other] == descend(1.0, lambda: 0, tree, vectorized=True)
+    tree['untried_moves'] = [0b10]
+    assert [tree] == descend(1.0, lambda: 0, tree)
+
+def test_prove_from_children():
+    # A winning reply for the opponent: lost, whatever the other children are
+    assert -1 == prove_from_children({ 'untried_moves': [0b1],
+                                       'moves': [{ 'proven': None }, { 'proven': 1 }] })
+    # Every child proven: minus the best one
+    assert 0 == prove_from_children({ 'untried_moves': [],
+                                      'moves': [{ 'proven': -1 }, { 'proven': 0 }] })
+    assert 1 == prove_from_children({ 'untried_moves': [],
+                                      'moves': [{ 'proven': -1 }, { 'proven': -1 }] })
+    # Not decided yet
+    assert None is prove_from_children({ 'untried_moves': [0b1],
+                                         'moves': [{ 'proven': -1 }] })
+    assert None is prove_from_children({ 'untried_moves': [],
+                                         'moves': [{ 'proven': -1 }, {}] })
+    # A draw, and the other child can't be a win any more
+    assert 0 == prove_from_children({ 'untried_moves': [],
+                                      'moves': [{ 'proven': 0 }, { 'lower': -1, 'upper': 0 }] })
+    assert None is prove_from_children({ 'untried_moves': [],
+                                         'moves': [{ 'proven': 0 }, { 'lower': -1, 'upper': 1 }] })
+
+def test_update_proofs():
+    # Player 0 completes the top row
+    leaf = { 'state': { 'board': [0b111000000, 0b000000011], 'player_to_move': 1 },
+             'terminal': True,
+             'untried_moves': [],
+             'moves': [] }
+    root = { 'state': { 'board': [0b011000000, 0b000000011], 'player_to_move': 0 },
+             'terminal': False,
+             'untried_moves': [0b000000100],
+             'moves': [leaf] }
+
+    update_proofs(check_win, [root, leaf])
+
+    assert 1 == leaf['proven']
+    # Lost for whoever moved into the root
+    assert -1 == root['proven']
+
+    # A child that can't be a win bounds its parent, without proving it
+    child = { 'terminal': False,
+              'untried_moves': [0b1],
+              'moves': [{ 'terminal': True, 'proven': 0 }] }
+    parent = { 'terminal': False, 'untried_moves': [], 'moves': [child] }
+
+    update_proofs(check_win, [parent, child, child['moves'][0]])
+
+    assert (-1, 0) == (child['lower'], child['upper'])
+    assert (0, 1) == (parent['lower'], parent['upper'])
+    assert 'proven' not in child and 'proven' not in parent
+
+def test_pick_child_solver():
+    busy_draw = { 'num_rollouts': 90, 'score': 0, 'proven': 0 }
+    quiet_unknown = { 'num_rollouts': 1, 'score': -1 }
+    no_better = { 'num_rollouts': 1, 'score': 1, 'lower': -1, 'upper': 0 }
+    node = { 'num_rollouts': 92, 'moves': [busy_draw, quiet_unknown, no_better] }
+
+    # Only the child that could still beat the proven draw
+    for vectorized in (False, True):
+        assert quiet_unknown is pick_child(1.2, lambda: 0, node, vectorized, solver=True)
+
+def test_proven_winner():
+    parent = { 'state': { 'board': [0, 0], 'player_to_move': 0 } }
+    node = { 'state': { 'board': [0b1, 0], 'player_to_move': 1 }, 'proven': 1 }
+
+    assert 0 == proven_winner([parent, node])
+    assert 1 == proven_winner([parent, { **node, 'proven': -1 }])
+    assert None is proven_winner([parent, { **node, 'proven': 0 }])
+
+def test_pick_solver_child():
+    busy_loss = { 'num_rollouts': 9, 'proven': -1 }
+    unknown = { 'num_rollouts': 5, 'proven': None }
+    quiet_win = { 'num_rollouts': 1, 'proven': 1 }
+
+    assert quiet_win is pick_solver_child([busy_loss, unknown, quiet_win])
+    assert unknown is pick_solver_child([busy_loss, unknown])
+    assert busy_loss is pick_solver_child([busy_loss])
+    # Not a move that may lose, when a draw is guaranteed
+    busy_risk = { 'num_rollouts': 9, 'lower': -1, 'upper': 0 }
+    quiet_draw = { 'num_rollouts': 1, 'proven': 0 }
+
+    assert quiet_draw is pick_solver_child([busy_risk, quiet_draw])
+
+def test_grow_tree_solver():
+    seed(123)
+    tree = make_root({ 'board': [0b011000000, 0b000000011], 'player_to_move': 0 })
+    report = grow_tree(solver_settings,
+                       lambda: randint(0, maxsize),
+                       tree,
+                       1000)
+
+    # Stops as soon as the winning move is found
+    assert report['solved']
+    assert report['iterations'] < 1000
+    assert -1 == tree['proven']
+
+    seed(123)
+    # One move left, which draws
+    tree = make_root({ 'board': [0b000011101, 0b101100010], 'player_to_move': 0 })
+
+    assert grow_tree(solver_settings,
+                     lambda: randint(0, maxsize),
+                     tree,
+                     1000)['solved']
+    assert 0 == tree['proven']
+
+def test_grow_tree_solver_proven_draws():
+    seed(123)
+    # Player 0 took a corner and player 1 the centre: a draw, with several
+    # moves proven to draw long before the others are refuted
+    tree = make_root({ 'board': [0b000000001, 0b000010000], 'player_to_move': 0 })
+    report = grow_tree(solver_settings,
+                       lambda: randint(0, maxsize),
+                       tree,
+                       5000)
+
+    assert report['solved']
+    assert report['iterations'] < 5000
+    assert 0 == tree['proven']
+    # Without waiting for the moves that can't be a win any more to be proven
+    assert all(map(lambda child: node_bounds(child)[1] <= 0, tree['moves']))
+    assert any(map(lambda child: 'proven' not in child, tree['moves']))
+
+def test_make_mcts_agent_solver():
+    seed(123)
+    reports = []
+    agent = make_mcts_agent(1.2,
+                            get_valid_moves_list,
+                            is_terminal,
+                            apply_move_to_state,
+                            check_win,
+                            2000,
+                            solver=True,
+                            report=reports.append)
+
+    # Player 0 can complete the top row
+    assert 0b100000000 == agent({ 'board': [0b011000000, 0b000000011],
+                                  'player_to_move': 0 })
+    # Player 1 has to block the top row
+    assert 0b100000000 == agent({ 'board': [0b011001000, 0b000100001],
+                                  'player_to_move': 1 })
+    assert all(map(lambda report: report['solved'], reports))
@@ -0,0 +1,194 @@
+from random import seed
+from mcts.mcts import State, Move
+from mcts.mcts_arrays import (
+    NO_NODE,
+    fits_in_int64,
+    make_node_store,
+    grow_node_store,
+    add_root,
+    expand_children,
+    materialise_state,
+    select_child,
+    select_and_expand,
+    backprop_path,
+    make_array_mcts_agent
+)
+from tictactoe.engine import (
+    get_valid_moves_list,
+    is_terminal,
+    apply_move_to_state,
+    check_win
+)
+from tictactoe.mnk import make_mnk_game
+
+
+def mock_get_valid_moves(state): # type: (State) -> list[Move]
+    if state['board'] == [0b010000101, 0b000011010]:
+        return [0b000100000, 0b001000000, 0b100000000]
+
+    return []
+
+def mock_is_terminal(state): # type: (State) -> bool
+    return state['board'] == [0b011000101, 0b000111010]
+
+def mock_apply_move(state, move): # type: (State, Move) -> State
+    return { 'board': [state['board'][0] | move, state['board'][1]],
+             'player_to_move': 1 - state['player_to_move'] }
+
+def test_grow_node_store():
+    store = make_node_store(2)
+    add_root(store, { 'board': [0, 0], 'player_to_move': 0 })
+    store['num_rollouts'][0] = 5
+
+    grow_node_store(store)
+
+    assert 4 == len(store['num_rollouts'])
+    assert [5, 0, 0, 0] == list(store['num_rollouts'])
+    assert [0, NO_NODE, NO_NODE, NO_NODE] == list(store['state'])
+    assert 1 == store['size']
+
+def test_expand_children():
+    # Capacity of 1 forces the store to double (twice) to fit the children
+    store = make_node_store(1)
+    root = add_root(store, { 'board': [0b010000101, 0b000011010],
+                             'player_to_move': 0 })
+
+    expand_children(mock_get_valid_moves, mock_is_terminal, store, root)
+
+    assert 4 == store['size']
+    assert 4 == len(store['parent'])
+    assert 1 == store['first_child'][root]
+    assert 3 == store['num_children'][root]
+    assert [0b000100000, 0b001000000, 0b100000000] == list(store['move'][1:4])
+    assert [root] * 3 == list(store['parent'][1:4])
+    # Children states are only created once visited
+    assert [NO_NODE] * 3 == list(store['state'][1:4])
+
+    assert { 'board': [0b011000101, 0b000011010],
+             'player_to_move': 1 } == materialise_state(mock_apply_move, store, 2)
+    assert 1 == store['state'][2]
+
+def test_expand_children_terminal():
+    store = make_node_store(4)
+    root = add_root(store, { 'board': [0b011000101, 0b000111010],
+                             'player_to_move': 0 })
+
+    expand_children(mock_get_valid_moves, mock_is_terminal, store, root)
+
+    assert 1 == store['size']
+    assert NO_NODE != store['first_child'][root]
+    assert 0 == store['num_children'][root]
+
+def test_fits_in_int64():
+    assert fits_in_int64([])
+    assert fits_in_int64([1, 1 << 62, -(1 << 63)])
+    assert not fits_in_int64([1, 1 << 63])
+
+def test_expand_children_wide_moves():
+    store = make_node_store(4)
+    root = add_root(store, { 'board': [0, 0], 'player_to_move': 0 })
+    wide_moves = [1 << 70, 1 << 3]
+
+    expand_children(lambda state: wide_moves, lambda state: False, store, root)
+
+    assert object == store['move'].dtype
+    assert wide_moves == list(store['move'][1:3])
+    # Still an object array after growing
+    grow_node_store(store)
+    assert object == store['move'].dtype
+    assert wide_moves == list(store['move'][1:3])
+
+def test_select_child():
+    store = make_node_store(4)
+    root = add_root(store, { 'board': [0b010000101, 0b000011010],
+                             'player_to_move': 0 })
+    expand_children(mock_get_valid_moves, mock_is_terminal, store, root)
+
+    # Unvisited children are picked first; tie-break between the unvisited ones
+    store['num_rollouts'][:3] = [3, 3, 0]
+    store['score'][:3] = [0, 1, 0]
+    assert 2 == select_child(1.5, lambda: 0, store, root)
+    assert 3 == select_child(1.5, lambda: 1, store, root)
+
+    # Identical statistics: tie-break
+    store['num_rollouts'][:4] = [3, 1, 1, 1]
+    store['score'][:4] = [0, 1, 1, 1]
+    assert 1 == select_child(1.5, lambda: 0, store, root)
+    assert 2 == select_child(1.5, lambda: 1, store, root)
+
+    # Higher score wins
+    store['num_rollouts'][:4] = [6, 2, 2, 2]
+    store['score'][:4] = [0, 0, 2, 1]
+    assert 2 == select_child(1.5, lambda: 0, store, root)
+
+def test_select_and_expand():
+    store = make_node_store(4)
+    root = add_root(store, { 'board': [0b010000101, 0b000011010],
+                             'player_to_move': 0 })
+
+    # Root is expanded, then the first unvisited child is picked
+    path = select_and_expand(1.5,
+                             lambda: 1,
+                             mock_get_valid_moves,
+                             mock_is_terminal,
+                             mock_apply_move,
+                             store,
+                             root)
+
+    assert [root, 2] == path
+    assert { 'board': [0b011000101, 0b000011010],
+             'player_to_move': 1 } == store['states'][store['state'][2]]
+
+def test_backprop_path():
+    store = make_node_store(4)
+    root = add_root(store, { 'board': [0b010000101, 0b000011010],
+                             'player_to_move': 0 })
+    expand_children(mock_get_valid_moves, mock_is_terminal, store, root)
+    materialise_state(mock_apply_move, store, 1)
+
+    backprop_path(0, store, [root, 1], -1)
+
+    assert [1, 1, 0, 0] == list(store['num_rollouts'])
+    # Root doesn't have a previous player. Player 0 moved into node 1
+    assert [-1, 1, 0, 0] == list(store['score'])
+
+    backprop_path(1, store, [root, 1], -1)
+
+    assert [2, 2, 0, 0] == list(store['num_rollouts'])
+    assert [-2, 0, 0, 0] == list(store['score'])
+
+    backprop_path(None, store, [root, 1], -1)
+
+    assert [3, 3, 0, 0] == list(store['num_rollouts'])
+    assert [-2, 0, 0, 0] == list(store['score'])
+
+def test_make_array_mcts_agent():
+    seed(123)
+    agent = make_array_mcts_agent(1.2,
+                                  get_valid_moves_list,
+                                  is_terminal,
+                                  apply_move_to_state,
+                                  check_win,
+                                  200,
+                                  initial_capacity=8)
+
+    # Player 0 can complete the top row
+    assert 0b100000000 == agent({ 'board': [0b011000000, 0b000000011],
+                                  'player_to_move': 0 })
+    # Player 1 has to block the top row
+    assert 0b100000000 == agent({ 'board': [0b011001000, 0b000100001],
+                                  'player_to_move': 1 })
+    assert isinstance(agent({ 'board': [0, 0], 'player_to_move': 0 }), int)
+
+def test_make_array_mcts_agent_large_board():
+    seed(123)
+    # 8 x 8 with guard bits: moves go up to bit 70
+    game = make_mnk_game(8, 8, 4)
+    agent = make_array_mcts_agent(1.2,
+                                  game['get_valid_moves_list'],
+                                  game['is_terminal'],
+                                  game['apply_move_to_state'],
+                                  game['check_win'],
+                                  20)
+
+    assert agent(game['new_game']) in game['get_valid_moves_list'](game['new_game'])
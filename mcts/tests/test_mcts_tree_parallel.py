@@ -0,0 +1,94 @@
+from random import seed
+from mcts.mcts import make_root, make_search_settings
+from mcts.mcts_tree_parallel import (
+    apply_virtual_loss,
+    revert_virtual_loss,
+    grow_tree_in_parallel,
+    make_tree_parallel_mcts_agent
+)
+from tictactoe.engine import (
+    get_valid_moves_list,
+    is_terminal,
+    apply_move_to_state,
+    check_win
+)
+from tictactoe.rollouts import batch_rollout
+
+
+settings = make_search_settings(1.2,
+                                get_valid_moves_list,
+                                is_terminal,
+                                apply_move_to_state,
+                                check_win)
+
+def test_virtual_loss():
+    leaf = { 'num_rollouts': 0, 'score': 0 }
+    root = { 'num_rollouts': 4, 'score': 1 }
+
+    apply_virtual_loss([root, leaf], 3)
+
+    assert { 'num_rollouts': 7, 'score': -2 } == root
+    assert { 'num_rollouts': 3, 'score': -3 } == leaf
+
+    revert_virtual_loss([root, leaf], 3)
+
+    assert { 'num_rollouts': 4, 'score': 1 } == root
+    assert { 'num_rollouts': 0, 'score': 0 } == leaf
+
+def test_grow_tree_in_parallel():
+    seed(123)
+    tree = grow_tree_in_parallel(settings,
+                                 make_root({ 'board': [0b000010000, 0b000000001],
+                                             'player_to_move': 0 }),
+                                 300,
+                                 4,
+                                 2)
+
+    # Exactly the budget was used, and no virtual loss is left behind
+    assert 300 == tree['num_rollouts']
+    assert 300 == sum(map(lambda child: child['num_rollouts'], tree['moves']))
+    assert 7 == len(tree['moves'])
+
+    def check_counts(node): # type: (dict) -> None
+        if node['moves']:
+            assert node['num_rollouts'] >= sum(map(lambda child: child['num_rollouts'],
+                                                   node['moves']))
+        assert abs(node['score']) <= node['num_rollouts']
+
+        for child in node['moves']:
+            check_counts(child)
+
+    check_counts(tree)
+
+def test_make_tree_parallel_mcts_agent():
+    seed(123)
+    agent = make_tree_parallel_mcts_agent(1.2,
+                                          get_valid_moves_list,
+                                          is_terminal,
+                                          apply_move_to_state,
+                                          check_win,
+                                          300,
+                                          num_threads=3)
+
+    # Player 0 can complete the top row
+    assert 0b100000000 == agent({ 'board': [0b011000000, 0b000000011],
+                                  'player_to_move': 0 })
+    # Player 1 has to block the top row
+    assert 0b100000000 == agent({ 'board': [0b011001000, 0b000100001],
+                                  'player_to_move': 1 })
+
+def test_make_tree_parallel_mcts_agent_batch_rollout():
+    seed(123)
+    agent = make_tree_parallel_mcts_agent(1.2,
+                                          get_valid_moves_list,
+                                          is_terminal,
+                                          apply_move_to_state,
+                                          check_win,
+                                          100,
+                                          num_threads=2,
+                                          rollouts_per_leaf=16,
+                                          batch_rollout=batch_rollout)
+
+    # Player 1 has to block the top row
+    assert 0b100000000 == agent({ 'board': [0b011001000, 0b000100001],
+                                  'player_to_move': 1 })
@@ -0,0 +1,33 @@
+from mcts.transposition import (
+    make_transposition_table,
+    lookup_transposition,
+    store_transposition
+)
+
+
+def test_lookup_transposition():
+    table = make_transposition_table(4)
+    store_transposition(table, (0b1, 0b10, 0), { 'num_rollouts': 1 })
+
+    assert { 'num_rollouts': 1 } == lookup_transposition(table, (0b1, 0b10, 0))
+    assert None is lookup_transposition(table, (0b10, 0b1, 0))
+    assert 1 == table['hits']
+
+def test_store_transposition():
+    table = make_transposition_table(2)
+    store_transposition(table, 'a', 1)
+    store_transposition(table, 'b', 2)
+    # 'a' becomes the most recently used entry...
+    lookup_transposition(table, 'a')
+    # ...so 'b' is evicted to make room
+    store_transposition(table, 'c', 3)
+
+    assert ['a', 'c'] == list(table['entries'].keys())
+    assert None is lookup_transposition(table, 'b')
+    assert 1 == table['evictions']
+
+    # Disabled table
+    table = make_transposition_table(0)
+    store_transposition(table, 'a', 1)
+
+    assert None is lookup_transposition(table, 'a')
@@ -0,0 +1,46 @@
+from typing import TypedDict, Hashable, Any, Optional
+from collections import OrderedDict
+
+
+'''
+  Transposition table: maps a hashable key of a state to the tree node that was
+  created for it, so that different move orders reaching the same state can
+  share it.
+  Holds at most 'max_entries' entries. When full, the least recently used entry
+  is evicted. Evicting an entry doesn't remove its node from the tree; that
+  state just stops being shared from then on.
+'''
+class TranspositionTable(TypedDict):
+    entries: 'OrderedDict[Hashable, Any]'
+    max_entries: int
+    hits: int
+    evictions: int
+
+def make_transposition_table(max_entries):
+    # type: (int) -> TranspositionTable
+    return { 'entries': OrderedDict(),
+             'max_entries': max_entries,
+             'hits': 0,
+             'evictions': 0 }
+
+def lookup_transposition(table, key):
+    # type: (TranspositionTable, Hashable) -> Optional[Any]
+    entry = table['entries'].get(key)
+
+    if entry is not None:
+        table['entries'].move_to_end(key)
+        table['hits'] += 1
+
+    return entry
+
+def store_transposition(table, key, entry):
+    # type: (TranspositionTable, Hashable, Any) -> None
+    if table['max_entries'] <= 0:
+        return
+
+    table['entries'][key] = entry
+    table['entries'].move_to_end(key)
+
+    while len(table['entries']) > table['max_entries']:
+        table['entries'].popitem(last=False)
+        table['evictions'] += 1
@@ -0,0 +1,166 @@
+from typing import TypedDict, Dict, Tuple, TypeVar, Callable, Optional, Hashable, List
+
+
+State = TypeVar("State")
+Move = TypeVar("Move")
+
+'''
+  Exact solver for two player, zero-sum games with alternating moves, using the
+  same game functions as mcts (plus a hashable key for each state):
+  negamax with alpha-beta pruning and a memo of every searched state.
+  Values are from the point of view of the player to move:
+     1 | win
+     0 | draw
+    -1 | loss
+  Assumes states have a 'player_to_move', like the ones in mcts.
+'''
+WIN = 1
+DRAW = 0
+LOSS = -1
+
+'''
+  A memo entry's value is only exact if the search of that state wasn't cut
+  off by the alpha-beta window; otherwise it is a bound on the exact value
+'''
+EXACT = 0
+LOWER_BOUND = 1 # value >= stored value
+UPPER_BOUND = 2 # value <= stored value
+
+class NegamaxSettings(TypedDict):
+    get_valid_moves: Callable[[State], List[Move]]
+    is_terminal: Callable[[State], bool]
+    apply_move: Callable[[State, Move], State]
+    check_win: Callable[[State], Optional[int]]
+    get_state_key: Callable[[State], Hashable]
+    # Optional hook to search the most promising moves first, which makes
+    # cut-offs happen sooner
+    order_moves: Optional[Callable[[State, List[Move]], List[Move]]]
+
+class Memo(TypedDict):
+    entries: Dict[Hashable, Tuple[int, int, Optional[Move]]] # value, bound, best move
+    nodes: int # states searched (not answered by the memo)
+    hits: int
+
+class Solution(TypedDict):
+    value: int
+    best_move: Optional[Move]
+
+def make_memo():
+    # type: () -> Memo
+    return { 'entries': {}, 'nodes': 0, 'hits': 0 }
+
+def terminal_value(check_win, state):
+    # type: (Callable[[State], int | None], State) -> int
+    winner = check_win(state)
+
+    if winner is None:
+        return DRAW
+
+    return WIN if winner == state['player_to_move'] else LOSS
+
+'''
+  Moves in the order to search them: the best move found by an earlier search
+  of the same state (if any) first, then the order_moves() hook's order
+'''
+def ordered_moves(settings, state, memo_move):
+    # type: (NegamaxSettings, State, Move | None) -> list[Move]
+    moves = list(settings['get_valid_moves'](state))
+
+    if settings['order_moves'] is not None:
+        moves = settings['order_moves'](state, moves)
+
+    if memo_move is not None and memo_move in moves:
+        moves.remove(memo_move)
+        moves.insert(0, memo_move)
+
+    return moves
+
+def negamax(settings, memo, state, alpha=LOSS, beta=WIN):
+    # type: (NegamaxSettings, Memo, State, int, int) -> int
+    key = settings['get_state_key'](state)
+    entry = memo['entries'].get(key)
+    memo_move = None
+    original_alpha = alpha
+
+    if entry is not None:
+        value, bound, memo_move = entry
+
+        if bound == EXACT:
+            memo['hits'] += 1
+            return value
+        if bound == LOWER_BOUND:
+            alpha = max(alpha, value)
+        else:
+            beta = min(beta, value)
+
+        if alpha >= beta:
+            memo['hits'] += 1
+            return value
+
+    memo['nodes'] += 1
+
+    if settings['is_terminal'](state):
+        value = terminal_value(settings['check_win'], state)
+        memo['entries'][key] = (value, EXACT, None)
+
+        return value
+
+    best_value = LOSS - 1
+    best_move = None
+
+    for move in ordered_moves(settings, state, memo_move):
+        value = -negamax(settings, memo, settings['apply_move'](state, move), -beta, -alpha)
+
+        if value > best_value:
+            best_value = value
+            best_move = move
+
+        alpha = max(alpha, value)
+
+        if alpha >= beta:
+            break
+
+    bound = (UPPER_BOUND if best_value <= original_alpha else
+             LOWER_BOUND if best_value >= beta else
+             EXACT)
+    memo['entries'][key] = (best_value, bound, best_move)
+
+    return best_value
+
+'''
+  Exact value of 'state' and a move that achieves it (None for terminal
+  states). Searching with the full window means that the value is exact even
+  when the memo entry for 'state' is a bound: there is nothing beyond a win or
+  a loss.
+'''
+def solve(settings, memo, state):
+    # type: (NegamaxSettings, Memo, State) -> Solution
+    value = negamax(settings, memo, state)
+
+    return { 'value': value,
+             'best_move': memo['entries'][settings['get_state_key'](state)][2] }
+
+'''
+  Perfect-play agent. The memo is kept between moves, so after the first
+  search most positions are answered straight from it.
+'''
+def make_negamax_agent(get_valid_moves,
+                       is_terminal,
+                       apply_move,
+                       check_win,
+                       get_state_key,
+                       order_moves=None):
+    # type: (Callable[[State], list[Move]], Callable[[State], bool], Callable[[State, Move], State], Callable[[State], int | None], Callable[[State], Hashable], Callable[[State, list[Move]], list[Move]] | None) -> Callable[[State], Move]
+    settings = { 'get_valid_moves': get_valid_moves,
+                 'is_terminal': is_terminal,
+                 'apply_move': apply_move,
+                 'check_win': check_win,
+                 'get_state_key': get_state_key,
+                 'order_moves': order_moves } # type: NegamaxSettings
+    memo = make_memo()
+
+    def agent(state):
+        # type: (State) -> Move
+        return solve(settings, memo, state)['best_move']
+
+    return agent
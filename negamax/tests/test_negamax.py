@@ -0,0 +1,127 @@
+from random import seed
+from negamax.negamax import (
+    WIN,
+    DRAW,
+    LOSS,
+    EXACT,
+    LOWER_BOUND,
+    UPPER_BOUND,
+    make_memo,
+    terminal_value,
+    ordered_moves,
+    negamax,
+    solve,
+    make_negamax_agent
+)
+from tictactoe.engine import (
+    get_valid_moves_list,
+    is_terminal,
+    apply_move_to_state,
+    check_win,
+    make_random_agent
+)
+from tictactoe.hashing import pack_state
+from tictactoe.tournament import play_recorded_game
+
+
+settings = { 'get_valid_moves': get_valid_moves_list,
+             'is_terminal': is_terminal,
+             'apply_move': apply_move_to_state,
+             'check_win': check_win,
+             'get_state_key': pack_state,
+             'order_moves': None }
+
+# Plain minimax over the whole tree, as ground truth
+def minimax(state): # type: (dict) -> int
+    if is_terminal(state):
+        return terminal_value(check_win, state)
+
+    return max(-minimax(apply_move_to_state(state, move))
+               for move in get_valid_moves_list(state))
+
+def test_terminal_value():
+    assert LOSS == terminal_value(check_win, { 'board': [0b111000000, 0b000000011],
+                                               'player_to_move': 1 })
+    assert DRAW == terminal_value(check_win, { 'board': [0b001110011, 0b110001100],
+                                               'player_to_move': 1 })
+
+def test_ordered_moves():
+    state = { 'board': [0b011000000, 0b000000011], 'player_to_move': 0 }
+
+    assert [0b100000000, 0b000000100, 0b000001000, 0b000010000, 0b000100000] == ordered_moves(
+        settings, state, 0b100000000)
+    assert [0b100000000, 0b000100000, 0b000010000, 0b000001000, 0b000000100] == ordered_moves(
+        { **settings, 'order_moves': lambda state, moves: moves[::-1] }, state, None)
+
+def test_negamax():
+    memo = make_memo()
+
+    # Player 0 can complete the top row
+    assert WIN == negamax(settings, memo, { 'board': [0b011000000, 0b000000011],
+                                            'player_to_move': 0 })
+    # Player 1 has to block the top row, which then wins
+    assert WIN == negamax(settings, memo, { 'board': [0b011001000, 0b000100001],
+                                            'player_to_move': 1 })
+    # Player 0 already has a line
+    assert LOSS == negamax(settings, memo, { 'board': [0b111000000, 0b000000011],
+                                             'player_to_move': 1 })
+
+def test_negamax_matches_minimax():
+    states = [{ 'board': [0b000010000, 0b000000001], 'player_to_move': 0 },
+              { 'board': [0b000000001, 0b000010000], 'player_to_move': 0 },
+              { 'board': [0b000010001, 0b100000000], 'player_to_move': 1 },
+              { 'board': [0b000000010, 0b000000000], 'player_to_move': 1 }]
+
+    for state in states:
+        assert minimax(state) == negamax(settings, make_memo(), state)
+
+def test_memo_bounds():
+    memo = make_memo()
+    state = { 'board': [0b000010000, 0b000000001], 'player_to_move': 0 }
+
+    # A narrow window leaves some states with bounds only
+    value = negamax(settings, memo, state, DRAW, WIN)
+    bounds = [bound for _, bound, _ in memo['entries'].values()]
+
+    assert value >= DRAW
+    assert EXACT in bounds
+    assert LOWER_BOUND in bounds or UPPER_BOUND in bounds
+    # Searching again with the full window still gives the exact value
+    assert minimax(state) == negamax(settings, memo, state)
+
+def test_solve():
+    memo = make_memo()
+    solution = solve(settings, memo, { 'board': [0, 0], 'player_to_move': 0 })
+
+    # Tic-tac-toe is a draw
+    assert DRAW == solution['value']
+    assert solution['best_move'] in get_valid_moves_list({ 'board': [0, 0],
+                                                           'player_to_move': 0 })
+    # Far fewer states searched than the ~550,000 of the full game tree
+    assert memo['nodes'] < 10000
+
+    state = { 'board': [0b011000000, 0b000000011], 'player_to_move': 0 }
+    solution = solve(settings, memo, state)
+
+    # Any move that keeps the win is a best move, not necessarily the quickest
+    assert WIN == solution['value']
+    assert LOSS == minimax(apply_move_to_state(state, solution['best_move']))
+    # Forced block
+    assert 0b100000000 == solve(settings, memo, { 'board': [0b011001000, 0b000100001],
+                                                  'player_to_move': 1 })['best_move']
+
+def test_make_negamax_agent():
+    seed(123)
+    agent = make_negamax_agent(get_valid_moves_list,
+                               is_terminal,
+                               apply_move_to_state,
+                               check_win,
+                               pack_state)
+    random_agent = make_random_agent(get_valid_moves_list)
+
+    # Never loses, whichever side it plays
+    for _ in range(10):
+        assert 1 != play_recorded_game([agent, random_agent],
+                                       { 'board': [0, 0], 'player_to_move': 0 })['winner']
+        assert 0 != play_recorded_game([random_agent, agent],
+                                       { 'board': [0, 0], 'player_to_move': 0 })['winner']
@@ -18,19 +18,17 @@ if __name__ == '__main__':
                                is_terminal,
                                apply_move_to_state,
                                check_win,
-                               0, # Player index!
                                1000),
                make_random_agent(get_valid_moves_list)],
               [NEW_GAME])
 
     n = 100
     print(f'------------------------------ Playing {n} games ------------------------------')
-    play_n_games([make_random_agent(get_valid_moves_list),
-                  make_mcts_agent(1.2,
-                                  get_valid_moves_list,
-                                  is_terminal,
-                                  apply_move_to_state,
-                                  check_win,
-                                  1, # Player index!
-                                  100)],
-                 n)
+    print(play_n_games([make_random_agent(get_valid_moves_list),
+                        make_mcts_agent(1.2,
+                                        get_valid_moves_list,
+                                        is_terminal,
+                                        apply_move_to_state,
+                                        check_win,
+                                        100)],
+                       n))
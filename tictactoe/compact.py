@@ -0,0 +1,99 @@
+from .constants import BOARD_AREA, BOARD_SIZE
+from .engine import State
+from .hashing import PLAYER_SHIFT, pack_state, unpack_state, apply_move_to_key
+from .tables import HAS_LINE, MOVE_LISTS
+
+
+'''
+  Immutable, hashable (two player) state holding nothing but the packed int of
+  hashing.py, so that making a move allocates one small object instead of a
+  dict and a list.
+  Indexing with 'board' / 'player_to_move' adapts it to code written for the
+  State dict, e.g. mcts reading the player to move. The 'board' is built on
+  every access, so hot paths should use the functions below instead.
+'''
+class CompactState:
+    __slots__ = ('key',)
+
+    key: int
+
+    def __init__(self, key):
+        # type: (int) -> None
+        object.__setattr__(self, 'key', key)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('CompactState is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError('CompactState is immutable')
+
+    # Default pickling of __slots__ would go through __setattr__
+    def __reduce__(self):
+        return (CompactState, (self.key,))
+
+    def __hash__(self):
+        # type: () -> int
+        return hash(self.key)
+
+    def __eq__(self, other):
+        # type: (object) -> bool
+        return isinstance(other, CompactState) and self.key == other.key
+
+    def __getitem__(self, name):
+        # type: (str) -> list[int] | int
+        if name == 'board':
+            return [self.key & BOARD_AREA, (self.key >> BOARD_SIZE) & BOARD_AREA]
+        if name == 'player_to_move':
+            return self.key >> PLAYER_SHIFT
+
+        raise KeyError(name)
+
+    def __repr__(self):
+        # type: () -> str
+        return f'CompactState({to_state(self)})'
+
+def from_state(state):
+    # type: (State) -> CompactState
+    return CompactState(pack_state(state))
+
+def to_state(state):
+    # type: (CompactState) -> State
+    return unpack_state(state.key)
+
+'''
+  Same interface as the functions of the same names in engine.py, so they can
+  be passed to the mcts agents as they are
+'''
+def apply_move_to_state(state, move):
+    # type: (CompactState, int) -> CompactState
+    return CompactState(apply_move_to_key(state.key, move))
+
+def check_win(state):
+    # type: (CompactState) -> int | None
+    key = state.key
+
+    if HAS_LINE[(key >> BOARD_SIZE) & BOARD_AREA]:
+        return 1
+    if HAS_LINE[key & BOARD_AREA]:
+        return 0
+
+    return None
+
+def is_terminal(state):
+    # type: (CompactState) -> bool
+    key = state.key
+
+    return (((key | (key >> BOARD_SIZE)) & BOARD_AREA) == BOARD_AREA
+            or HAS_LINE[key & BOARD_AREA]
+            or HAS_LINE[(key >> BOARD_SIZE) & BOARD_AREA])
+
+def get_valid_moves_list(state):
+    # type: (CompactState) -> tuple[int, ...]
+    key = state.key
+
+    return () if is_terminal(state) else MOVE_LISTS[BOARD_AREA & ~(key | (key >> BOARD_SIZE))]
+
+# For get_state_key in mcts
+def get_state_key(state):
+    # type: (CompactState) -> int
+    return state.key
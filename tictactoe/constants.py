@@ -10,7 +10,8 @@ PLAYER_PIECE_SYMBOLS = ['O', 'X']
 
 BOARD_AREA = (1 << BOARD_SIZE) - 1
 
-# TO-DO: find a way to generate this dynamically for arbitrary board dimensions
+# Lines for arbitrary board dimensions are generated in mnk.py, which uses a
+# different bit layout (with guard bits), see generate_lines()
 THREE_IN_A_ROW = [0b001001001,
                   0b010010010,
                   0b100100100,
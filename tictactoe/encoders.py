@@ -49,3 +49,9 @@ def one_hot_encode_move(move):
             encoded[r][c] = 1
 
     return encoded
+
+# Index of the square of a (single-bit) move, for laying out per-move values
+# on the board e.g. a policy from mcts
+def move_to_square_index(move):
+    # type: (int) -> int
+    return move.bit_length() - 1
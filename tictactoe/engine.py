@@ -3,8 +3,9 @@ from functools import reduce
 from operator import itemgetter
 from random import randint
 from tail_recursive import tail_recursive, FeatureSet
-from .constants import BOARD_AREA, THREE_IN_A_ROW, BOARD_SIZE, WIDTH, NEW_GAME
+from .constants import BOARD_AREA, BOARD_SIZE, WIDTH, NEW_GAME
 from .printing import print_game_state, print_board
+from .tables import HAS_LINE, MOVE_LISTS, set_bits
 
 
 class State(TypedDict):
@@ -22,17 +23,7 @@ class State(TypedDict):
 '''
 def separate_bitboard(bitboard):
     # type: (int) -> list[int]
-    def loop(n, list_of_bitboards):
-        # type: (int, list[int]) -> list[int]
-        if n == 0:
-            return list_of_bitboards
-
-        remove_rightmost_setbit =  n & (n - 1)
-
-        return loop(remove_rightmost_setbit,
-                    list_of_bitboards + [(n ^ remove_rightmost_setbit)])
-
-    return loop(bitboard, [])
+    return list(set_bits(bitboard))
 
 # Bitwise-and with the boundary of the board so that we don't have to deal with
 # negative number arithmetic
@@ -70,37 +61,51 @@ def is_full(bitboards):
     None  | neither player has won
      0    | player 1 wins
      1    | player 2 wins
+  If (somehow) more than one player has a line, the last one is reported.
 '''
 def check_win(state):
     # type: (State) -> int | None
-    def loop(player, win):
-        # type: (int, int | None) -> int | None
-        if player >= len(state['board']):
-            return win
+    win = None
 
-        if reduce(
-            lambda result, direction:
-                result or (direction == (state['board'][player] & direction)),
-            THREE_IN_A_ROW,
-            False):
+    for player, bitboard in enumerate(state['board']):
+        if HAS_LINE[bitboard]:
+            win = player
 
-            return loop(player + 1, player)
+    return win
 
-        return loop(player + 1, win)
+'''
+  Fused terminal check on the bitboards: one table lookup per player for a
+  line, plus whether 'occupied' (all the players' pieces) fills the board.
+  Callers that already have 'occupied' pass it in to avoid recomputing it.
+'''
+def is_game_over(bitboards, occupied):
+    # type: (list[int], int) -> bool
+    if occupied == BOARD_AREA:
+        return True
+
+    for bitboard in bitboards:
+        if HAS_LINE[bitboard]:
+            return True
 
-    return loop(0, None)
+    return False
 
 def is_terminal(state):
     # type: (State) -> bool
-    return is_full(state['board']) or (check_win(state) is not None)
+    board = state['board']
+
+    return is_game_over(board, reduce(lambda a, b: a | b, board))
 
+'''
+  Returns a tuple shared with every other caller (from MOVE_LISTS), so it must
+  not be mutated
+'''
 def get_valid_moves_list(state):
-    # type: (State) -> list[int]
-    valid_moves_bitmask = get_valid_moves_bitmask(state['board'])
+    # type: (State) -> tuple[int, ...]
+    board = state['board']
+    occupied = reduce(lambda a, b: a | b, board)
 
-    return (separate_bitboard(valid_moves_bitmask)
-           if (valid_moves_bitmask > 0) and not is_terminal(state)
-           else [])
+    return (() if is_game_over(board, occupied)
+            else MOVE_LISTS[BOARD_AREA & ~occupied])
 
 
 def make_random_agent(get_moves_list):
@@ -117,9 +122,10 @@ def make_random_agent(get_moves_list):
 
 # Lots of visual information to help debugging
 def play_game(agents, initial_board):
-    # type: (list[Callable[[State], int]], list[int]) -> None
-    def loop(history):
-        # type: (list[list[int]]) -> None
+    # type: (list[Callable[[State], int]], list[list[int]]) -> list[list[int]]
+    history = list(initial_board)
+
+    while True:
         turn_number = len(history) - 1
         player_to_move = turn_number % len(agents)
         current_bitboards = history[turn_number]
@@ -131,7 +137,7 @@ def play_game(agents, initial_board):
                     # Only including it for completeness' sake
         new_state = { 'board': new_bitboards,
                       'player_to_move': (turn_number + 1) % len(agents) }
-        new_history = history + [new_bitboards]
+        history.append(new_bitboards)
         win_status = check_win(new_state)
 
         print(f'Turn {turn_number + 1}')
@@ -145,51 +151,36 @@ def play_game(agents, initial_board):
         print_board(BOARD_SIZE, WIDTH, new_bitboards)
         print() # newline
         if is_terminal(new_state):
-            return new_history
-
-        return loop(new_history)
-
-    return loop(initial_board)
+            return history
 
 # No visual information, used for simulating a large amount of games
+# Only the current board is kept, not the history
 def play_game_result(agents, initial_board):
-    # type: (list[Callable[[State], int]], list[int]) -> int | None
-    def loop(history):
-        # type: (list[list[int]]) -> int | None
-        turn_number = len(history) - 1
-        player_to_move = turn_number % len(agents)
-        current_bitboards = history[turn_number]
-        current_state = { 'board': current_bitboards,
-                          'player_to_move': player_to_move }
-        move = agents[player_to_move](current_state)
-        new_bitboards = apply_move(current_bitboards, player_to_move, move)
-                    # We don't actually use the new player_to_move
-                    # Only including it for completeness' sake
-        new_state = { 'board': new_bitboards,
-                      'player_to_move': (turn_number + 1) % len(agents) }
-        new_history = history + [new_bitboards]
-        win_status = check_win(new_state)
-
-        if is_terminal(new_state):
-            return win_status
+    # type: (list[Callable[[State], int]], list[list[int]]) -> int | None
+    turn_number = len(initial_board) - 1
+    state = { 'board': initial_board[turn_number],
+              'player_to_move': turn_number % len(agents) }
 
-        return loop(new_history)
+    while True:
+        move = agents[state['player_to_move']](state)
+        state = apply_move_to_state(state, move)
 
-    return loop(initial_board)
+        if is_terminal(state):
+            return check_win(state)
 
 def play_n_games(agents, num_games):
     # type: (list[Callable[[State], int]], int) -> dict
-    stats = { 'wins': [0, 0], 'draws': 0 }
+    stats = { 'wins': [0] * len(agents), 'draws': 0 }
 
     for _ in range(num_games):
         result = play_game_result(agents, [NEW_GAME])
 
-        stats = ({ **stats, 'draws': stats['draws'] + 1 } if result is None else
-                 { **stats,
-                   'wins': [w + 1 if i == result else w
-                                for i, w in enumerate(stats['wins'])] })
+        if result is None:
+            stats['draws'] += 1
+        else:
+            stats['wins'][result] += 1
 
-    return print(stats)
+    return stats
 
 
 if __name__ == '__main__':
@@ -200,6 +191,6 @@ if __name__ == '__main__':
 
     n = 900
     print(f'------------------------------ Playing {n} games ------------------------------')
-    play_n_games([make_random_agent(get_valid_moves_list),
-                  make_random_agent(get_valid_moves_list)],
-                 n)
+    print(play_n_games([make_random_agent(get_valid_moves_list),
+                        make_random_agent(get_valid_moves_list)],
+                       n))
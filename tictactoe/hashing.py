@@ -0,0 +1,40 @@
+from .constants import BOARD_AREA, BOARD_SIZE
+from .engine import State
+
+
+'''
+  Packs a (two player) state into a single int, which can be used as a key for
+  caches, transposition tables etc. (the State dict holds a list so it isn't
+  hashable):
+      bits  0- 8: player 0's bitboard
+      bits  9-17: player 1's bitboard
+      bit  18   : player to move
+  The packing is exact, so unpack_state() gives the original state back.
+'''
+PLAYER_SHIFT = 2 * BOARD_SIZE
+
+def pack_bitboards(bitboards, player_to_move):
+    # type: (list[int], int) -> int
+    return bitboards[0] | (bitboards[1] << BOARD_SIZE) | (player_to_move << PLAYER_SHIFT)
+
+def pack_state(state):
+    # type: (State) -> int
+    return pack_bitboards(state['board'], state['player_to_move'])
+
+def unpack_state(key):
+    # type: (int) -> State
+    return { 'board': [key & BOARD_AREA, (key >> BOARD_SIZE) & BOARD_AREA],
+             'player_to_move': key >> PLAYER_SHIFT }
+
+'''
+  Key of apply_move_to_state(unpack_state(key), move) without unpacking:
+  sets the move's bit on the board of the player to move and flips the player.
+  Like apply_move(), a move on an occupied square leaves the board unchanged.
+'''
+def apply_move_to_key(key, move):
+    # type: (int, int) -> int
+    player_to_move = key >> PLAYER_SHIFT
+    occupied = (key | (key >> BOARD_SIZE)) & BOARD_AREA
+    move = move & BOARD_AREA & ~occupied
+
+    return (key | (move << (BOARD_SIZE * player_to_move))) ^ (1 << PLAYER_SHIFT)
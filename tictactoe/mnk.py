@@ -0,0 +1,222 @@
+from typing import TypedDict, List, Callable
+from functools import partial, reduce
+from .engine import State
+
+
+'''
+  m,n,k-game: 'rows' x 'cols' board, the first player to get 'k' in a row
+  (horizontally, vertically or diagonally) wins. Tic-tac-toe is the 3,3,3-game,
+  gomoku the 15,15,5-game.
+
+  Bitboards have one bit per square, but every row is followed by an always
+  empty guard bit: square (row, col) is bit row * (cols + 1) + col.
+  Shifting a bitboard by 'stride' = cols + 1 moves every piece one row, by 1 one
+  column, by stride + 1 and stride - 1 along the two diagonals. Runs that would
+  wrap around the edge of the board run into a guard bit instead, which is what
+  lets has_run() find k in a row with a few shifts and ANDs per direction,
+  without checking every line on the board.
+  Moves are single-bit ints, like in engine.py, and states use the same State
+  dict, so everything in mcts works with these games unchanged.
+'''
+class MNKRules(TypedDict):
+    rows: int
+    cols: int
+    k: int
+    stride: int
+    area: int # all the real (non-guard) squares
+    directions: List[int] # shifts along a row, a column and both diagonals
+    lines: List[int] # every k in a row, generated by generate_lines()
+    lines_through: List[List[int]] # bit index of a square -> lines through it
+
+'''
+  States made by apply_move_to_state() carry the result of the game so far, so
+  that check_win() and is_terminal() just read it. Only the lines through the
+  square just played can have been completed by a move, see
+  check_win_after_move(). States built some other way (without these keys)
+  are checked from scratch.
+'''
+class MNKState(State, total=False):
+    winner: 'int | None'
+    terminal: bool
+
+def square_to_move(rules, row, col):
+    # type: (MNKRules, int, int) -> int
+    return 1 << (row * rules['stride'] + col)
+
+def move_to_square(rules, move):
+    # type: (MNKRules, int) -> tuple[int, int]
+    return divmod(move.bit_length() - 1, rules['stride'])
+
+'''
+  Masks of every k squares in a row on a 'rows' x 'cols' board where square
+  (row, col) is bit row * stride + col. Only needed where the individual lines
+  are, e.g. to build indices; win detection itself uses has_run().
+'''
+def generate_lines(rows, cols, k, stride):
+    # type: (int, int, int, int) -> list[int]
+    steps = [(0, 1), (1, 0), (1, 1), (1, -1)]
+
+    return [reduce(lambda line, i: line | (1 << ((row + i * dr) * stride + col + i * dc)),
+                   range(k),
+                   0)
+            for dr, dc in steps
+            for row in range(rows)
+            for col in range(cols)
+            if 0 <= row + (k - 1) * dr < rows and 0 <= col + (k - 1) * dc < cols]
+
+def make_rules(rows, cols, k):
+    # type: (int, int, int) -> MNKRules
+    if rows < 1 or cols < 1 or k < 1:
+        raise ValueError(f'Invalid {rows},{cols},{k}-game')
+
+    stride = cols + 1
+    lines = generate_lines(rows, cols, k, stride)
+
+    return { 'rows': rows,
+             'cols': cols,
+             'k': k,
+             'stride': stride,
+             'area': reduce(lambda area, row: area | (((1 << cols) - 1) << (row * stride)),
+                            range(rows),
+                            0),
+             'directions': [1, stride, stride + 1, stride - 1],
+             'lines': lines,
+             'lines_through': [[line for line in lines if line & (1 << square)]
+                               for square in range(rows * stride)] }
+
+'''
+  True if 'bitboard' has 'k' set bits in a row, each 'shift' bits apart.
+  After each doubling step, bit i of 'run' is set if there are 'length' pieces
+  in a row starting at bit i; one more AND tops that up to exactly k.
+  Takes O(log k) shifts instead of k.
+'''
+def has_run(bitboard, shift, k):
+    # type: (int, int, int) -> bool
+    run = bitboard
+    length = 1
+
+    while 2 * length <= k:
+        run &= run >> (shift * length)
+        length *= 2
+
+    if length < k:
+        run &= run >> (shift * (k - length))
+
+    return run != 0
+
+def has_k_in_a_row(rules, bitboard):
+    # type: (MNKRules, int) -> bool
+    k = rules['k']
+
+    for shift in rules['directions']:
+        if has_run(bitboard, shift, k):
+            return True
+
+    return False
+
+def get_valid_moves_bitmask(rules, bitboards):
+    # type: (MNKRules, list[int]) -> int
+    return rules['area'] & ~reduce(lambda a, b: a | b, bitboards)
+
+'''
+  Whether 'move' completed k in a row on 'bitboard' (which includes it), only
+  testing the lines through the square of the move
+'''
+def check_win_after_move(rules, bitboard, move):
+    # type: (MNKRules, int, int) -> bool
+    for line in rules['lines_through'][move.bit_length() - 1]:
+        if line & bitboard == line:
+            return True
+
+    return False
+
+def check_win_from_scratch(rules, state):
+    # type: (MNKRules, State) -> int | None
+    win = None
+
+    for player, bitboard in enumerate(state['board']):
+        if has_k_in_a_row(rules, bitboard):
+            win = player
+
+    return win
+
+'''
+  The functions below have the same interface as those of the same names in
+  engine.py once 'rules' is bound, see make_mnk_game()
+'''
+def apply_move_to_state(rules, state, move):
+    # type: (MNKRules, MNKState, int) -> MNKState
+    board, player_to_move = state['board'], state['player_to_move']
+    winner = check_win(rules, state)
+    empty = get_valid_moves_bitmask(rules, board)
+
+    # A move on an occupied square or off the board leaves the board unchanged
+    if move & empty:
+        board = [bitboard | move if player == player_to_move else bitboard
+                 for player, bitboard in enumerate(board)]
+        empty ^= move
+
+        if check_win_after_move(rules, board[player_to_move], move):
+            winner = player_to_move
+
+    return { 'board': board,
+             'player_to_move': (player_to_move + 1) % len(board),
+             'winner': winner,
+             'terminal': winner is not None or empty == 0 }
+
+def check_win(rules, state):
+    # type: (MNKRules, MNKState) -> int | None
+    if 'winner' in state:
+        return state['winner']
+
+    return check_win_from_scratch(rules, state)
+
+def is_terminal(rules, state):
+    # type: (MNKRules, MNKState) -> bool
+    if 'terminal' in state:
+        return state['terminal']
+
+    return (get_valid_moves_bitmask(rules, state['board']) == 0
+            or check_win_from_scratch(rules, state) is not None)
+
+def get_valid_moves_list(rules, state):
+    # type: (MNKRules, MNKState) -> list[int]
+    if check_win(rules, state) is not None:
+        return []
+
+    empty = get_valid_moves_bitmask(rules, state['board'])
+    moves = []
+
+    while empty:
+        remove_rightmost_setbit = empty & (empty - 1)
+        moves.append(empty ^ remove_rightmost_setbit)
+        empty = remove_rightmost_setbit
+
+    return moves
+
+class MNKGame(TypedDict):
+    rules: MNKRules
+    new_game: MNKState
+    get_valid_moves_list: Callable[[MNKState], List[int]]
+    is_terminal: Callable[[MNKState], bool]
+    apply_move_to_state: Callable[[MNKState, int], MNKState]
+    check_win: Callable[[MNKState], 'int | None']
+
+'''
+  The rules and game functions of an m,n,k-game, ready to pass to mcts.
+  The functions are partials of the module level functions, so (unlike
+  closures) they can be pickled and sent to worker processes.
+'''
+def make_mnk_game(rows, cols, k):
+    # type: (int, int, int) -> MNKGame
+    rules = make_rules(rows, cols, k)
+
+    return { 'rules': rules,
+             'new_game': { 'board': [0, 0],
+                           'player_to_move': 0,
+                           'winner': None,
+                           'terminal': False },
+             'get_valid_moves_list': partial(get_valid_moves_list, rules),
+             'is_terminal': partial(is_terminal, rules),
+             'apply_move_to_state': partial(apply_move_to_state, rules),
+             'check_win': partial(check_win, rules) }
@@ -0,0 +1,45 @@
+from typing import Callable
+from .constants import BOARD_AREA
+from .engine import State
+from .tables import WINNING_SQUARES, random_square
+
+
+'''
+  Rollout policies for simulate() in mcts: given a non-terminal state and a
+  function returning random ints, pick the next move of a playout.
+  Ties are broken at random, with random_square().
+'''
+
+def empty_squares(state):
+    # type: (State) -> int
+    return BOARD_AREA & ~(state['board'][0] | state['board'][1])
+
+'''
+  Decisive policy: takes an immediate win if there is one, otherwise plays a
+  uniformly random move. Playouts no longer miss wins in one, and end sooner.
+'''
+def decisive_move(state, random_int):
+    # type: (State, Callable[[], int]) -> int
+    empty = empty_squares(state)
+    wins = WINNING_SQUARES[state['board'][state['player_to_move']]] & empty
+
+    return random_square(wins if wins else empty, random_int())
+
+'''
+  As decisive_move(), but blocks the opponent's immediate win before falling
+  back to a random move. decisive_move() is the better default for tic-tac-toe.
+'''
+def anti_decisive_move(state, random_int):
+    # type: (State, Callable[[], int]) -> int
+    player_to_move = state['player_to_move']
+    empty = empty_squares(state)
+
+    wins = WINNING_SQUARES[state['board'][player_to_move]] & empty
+    if wins:
+        return random_square(wins, random_int())
+
+    blocks = WINNING_SQUARES[state['board'][1 - player_to_move]] & empty
+    if blocks:
+        return random_square(blocks, random_int())
+
+    return random_square(empty, random_int())
@@ -0,0 +1,79 @@
+from typing import Callable
+import numpy as np
+import numpy.typing as npt
+from .constants import BOARD_AREA, BOARD_SIZE
+from .engine import State
+from .tables import HAS_LINE
+
+
+# check_win() returns None when there is no winner, which can't be stored in an
+# integer array
+NO_WINNER = -1
+
+HAS_LINE_ARRAY = np.array(HAS_LINE, dtype=np.bool_)
+
+# Number of set bits of every 9-bit bitboard
+POPCOUNT = np.array([bin(bitboard).count('1') for bitboard in range(BOARD_AREA + 1)],
+                    dtype=np.int64)
+
+def has_line(bitboards):
+    # type: (npt.NDArray[np.int64]) -> npt.NDArray[np.bool_]
+    return HAS_LINE_ARRAY[bitboards]
+
+'''
+  Picks one set bit uniformly at random from each bitboard (which must have at
+  least one set bit), using the same trick as separate_bitboard():
+  n & (n - 1) removes the rightmost set bit of n. Remove k of them, with k
+  random, then isolate the rightmost remaining bit with n & -n
+'''
+def pick_random_bits(bitboards, rng):
+    # type: (npt.NDArray[np.int64], np.random.Generator) -> npt.NDArray[np.int64]
+    k = rng.integers(0, POPCOUNT[bitboards])
+
+    for _ in range(BOARD_SIZE - 1):
+        bitboards = np.where(k > 0, bitboards & (bitboards - 1), bitboards)
+        k = k - 1
+
+    return bitboards & -bitboards
+
+'''
+  Plays N games to the end at once, all moves picked uniformly at random.
+  'boards' has shape (N, 2): the two players' bitboards for each game.
+  Returns, for each game, the same result check_win() gives on its final
+  state, with NO_WINNER in place of None.
+'''
+def play_out_batch(boards, players_to_move, rng):
+    # type: (npt.NDArray[np.int64], npt.NDArray[np.int64], np.random.Generator) -> npt.NDArray[np.int64]
+    boards = np.array(boards, dtype=np.int64)
+    players_to_move = np.array(players_to_move, dtype=np.int64)
+    games = np.arange(len(boards))
+
+    for _ in range(BOARD_SIZE + 1):
+        wins_0 = has_line(boards[:, 0])
+        wins_1 = has_line(boards[:, 1])
+        empty = BOARD_AREA & ~(boards[:, 0] | boards[:, 1])
+        playing = ~(wins_0 | wins_1 | (empty == 0))
+
+        if not playing.any():
+            break
+
+        moves = pick_random_bits(empty[playing], rng)
+        boards[games[playing], players_to_move[playing]] |= moves
+        players_to_move[playing] = 1 - players_to_move[playing]
+
+    # If (somehow) both players have a line, check_win() reports the last one
+    return np.where(wins_1, 1, np.where(wins_0, 0, NO_WINNER))
+
+'''
+  Hook for simulate_many() in mcts: plays 'num_rollouts' random games from
+  'state' as one batch. The batch's generator is seeded from random_int() so
+  that it follows the seeding of the search.
+'''
+def batch_rollout(state, num_rollouts, random_int):
+    # type: (State, int, Callable[[], int]) -> list[int | None]
+    results = play_out_batch(np.tile(np.array(state['board'], dtype=np.int64),
+                                     (num_rollouts, 1)),
+                             np.full(num_rollouts, state['player_to_move'], dtype=np.int64),
+                             np.random.default_rng(random_int()))
+
+    return [None if result == NO_WINNER else result for result in results.tolist()]
@@ -0,0 +1,219 @@
+from typing import TypedDict, List, Callable
+from multiprocessing import Process, Queue
+from os import makedirs, path
+from queue import Empty
+from random import seed, randint, choices
+from sys import maxsize
+from traceback import format_exc
+import numpy as np
+import numpy.typing as npt
+from mcts.mcts import RootStatistics, make_mcts_agent
+from .constants import BOARD_SIZE, WIDTH, HEIGHT, NEW_GAME
+from .encoders import state_to_one_plane_encoding, move_to_square_index
+from .engine import (
+    State,
+    get_valid_moves_list,
+    is_terminal,
+    apply_move_to_state,
+    check_win
+)
+
+
+'''
+  Self-play data generation: MCTS plays against itself in several worker
+  processes, and every position of every game is recorded as a training example:
+    - 'states':   the position, state_to_one_plane_encoding()
+    - 'policies': the visit counts of the root's children, normalised and laid
+                  out on the board like one_hot_encode_move()
+    - 'outcomes': the result of the game for the player to move in that
+                  position (1 win, 0 draw, -1 loss)
+  Workers send finished games through a bounded queue (so they block instead
+  of piling up results when writing falls behind) to the parent process, which
+  writes them to .npz files of 'shard_size' positions each.
+  Besides games, a worker sends None when it is done and the traceback (a str)
+  if it fails.
+'''
+class GameExamples(TypedDict):
+    states: npt.NDArray[np.int8]
+    policies: npt.NDArray[np.float32]
+    outcomes: npt.NDArray[np.int8]
+
+class SelfPlaySummary(TypedDict):
+    games: int
+    positions: int
+    shards: List[str]
+
+'''
+  MCTS agent that also returns the root statistics, with the policy (at
+  temperature 1, i.e. the visit distribution) laid out by board square
+'''
+def make_self_play_agent(exploration, iterations):
+    # type: (float, int) -> Callable[[State], tuple[int, RootStatistics]]
+    return make_mcts_agent(exploration,
+                           get_valid_moves_list,
+                           is_terminal,
+                           apply_move_to_state,
+                           check_win,
+                           iterations,
+                           return_root_statistics=True,
+                           temperature=1.0,
+                           move_to_index=move_to_square_index,
+                           policy_size=BOARD_SIZE)
+
+'''
+  Plays one game. For the first 'sampling_plies' plies the move is drawn from
+  the policy rather than being the most visited, so that games (and so the
+  training data) don't all follow the same line.
+'''
+def play_self_play_game(agent, sampling_plies):
+    # type: (Callable[[State], tuple[int, RootStatistics]], int) -> GameExamples
+    state = { 'board': NEW_GAME, 'player_to_move': 0 } # type: State
+    states, policies, players = [], [], []
+
+    while not is_terminal(state):
+        move, statistics = agent(state)
+        policy = statistics['policy']
+
+        if len(states) < sampling_plies:
+            move = 1 << choices(range(BOARD_SIZE), weights=policy.tolist())[0]
+
+        states.append(state_to_one_plane_encoding(state))
+        policies.append(policy.reshape(HEIGHT, WIDTH))
+        players.append(state['player_to_move'])
+        state = apply_move_to_state(state, move)
+
+    winner = check_win(state)
+
+    return { 'states': np.array(states, dtype=np.int8).reshape(-1, HEIGHT, WIDTH),
+             'policies': np.array(policies, dtype=np.float32).reshape(-1, HEIGHT, WIDTH),
+             'outcomes': np.array([0 if winner is None else 1 if winner == player else -1
+                                   for player in players],
+                                  dtype=np.int8) }
+
+'''
+  Entry point for the worker processes. Seeds the global generator, which the
+  agent and the move sampling draw from.
+'''
+def self_play_worker(exploration, iterations, sampling_plies, num_games, worker_seed, queue):
+    # type: (float, int, int, int, int, Queue) -> None
+    try:
+        seed(worker_seed)
+        agent = make_self_play_agent(exploration, iterations)
+
+        for _ in range(num_games):
+            queue.put(play_self_play_game(agent, sampling_plies))
+    except Exception:
+        queue.put(format_exc())
+    finally:
+        queue.put(None)
+
+# How often (in seconds) the parent checks on the workers while waiting for games
+WORKER_POLL_SECONDS = 1.0
+
+'''
+  Next item from the workers' queue. Raises RuntimeError if a worker failed,
+  or exited abnormally (e.g. was killed) without saying it was done, rather
+  than waiting forever.
+'''
+def get_from_workers(queue, processes):
+    # type: (Queue, list[Process]) -> GameExamples | None
+    while True:
+        try:
+            item = queue.get(timeout=WORKER_POLL_SECONDS)
+        except Empty:
+            for process in processes:
+                if process.exitcode not in (None, 0):
+                    raise RuntimeError(f'Self-play worker exited with code {process.exitcode}')
+            continue
+
+        if isinstance(item, str):
+            raise RuntimeError(f'Self-play worker failed:\n{item}')
+
+        return item
+
+def concatenate_examples(games):
+    # type: (list[GameExamples]) -> GameExamples
+    return { 'states': np.concatenate([game['states'] for game in games]),
+             'policies': np.concatenate([game['policies'] for game in games]),
+             'outcomes': np.concatenate([game['outcomes'] for game in games]) }
+
+def write_shard(output_dir, shard_number, examples):
+    # type: (str, int, GameExamples) -> str
+    file_name = path.join(output_dir, f'self_play_{shard_number:05d}.npz')
+    np.savez(file_name, **examples)
+
+    return file_name
+
+'''
+  Plays 'num_games' games over 'workers' processes, writing the examples to
+  'output_dir' in shards of 'shard_size' positions (the last one may be
+  smaller). Each worker seeds its generator from the global one.
+'''
+def generate_self_play_data(output_dir,
+                            num_games,
+                            workers=1,
+                            iterations=200,
+                            exploration=1.2,
+                            sampling_plies=2,
+                            shard_size=4096,
+                            queue_size=16):
+    # type: (str, int, int, int, float, int, int, int) -> SelfPlaySummary
+    makedirs(output_dir, exist_ok=True)
+    workers = max(1, min(workers, num_games))
+    queue = Queue(maxsize=queue_size) # type: Queue
+    processes = [Process(target=self_play_worker,
+                         args=(exploration,
+                               iterations,
+                               sampling_plies,
+                               num_games // workers + (1 if i < num_games % workers else 0),
+                               randint(0, maxsize),
+                               queue))
+                 for i in range(workers)]
+
+    for process in processes:
+        process.start()
+
+    shards = [] # type: list[str]
+    pending = [] # type: list[GameExamples]
+    pending_positions = 0
+    games = 0
+    positions = 0
+    running = workers
+
+    try:
+        while running > 0:
+            game = get_from_workers(queue, processes)
+
+            if game is None:
+                running -= 1
+                continue
+
+            games += 1
+            positions += len(game['outcomes'])
+            pending.append(game)
+            pending_positions += len(game['outcomes'])
+
+            while pending_positions >= shard_size:
+                examples = concatenate_examples(pending)
+                shards.append(write_shard(output_dir,
+                                          len(shards),
+                                          { 'states': examples['states'][:shard_size],
+                                            'policies': examples['policies'][:shard_size],
+                                            'outcomes': examples['outcomes'][:shard_size] }))
+                pending = [{ 'states': examples['states'][shard_size:],
+                             'policies': examples['policies'][shard_size:],
+                             'outcomes': examples['outcomes'][shard_size:] }]
+                pending_positions -= shard_size
+    except BaseException:
+        # The other workers may be blocked on the full queue
+        for process in processes:
+            process.terminate()
+        raise
+    finally:
+        for process in processes:
+            process.join()
+
+    if pending_positions > 0:
+        shards.append(write_shard(output_dir, len(shards), concatenate_examples(pending)))
+
+    return { 'games': games, 'positions': positions, 'shards': shards }
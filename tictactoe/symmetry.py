@@ -0,0 +1,111 @@
+from typing import Callable
+from .constants import BOARD_AREA, BOARD_SIZE, WIDTH
+from .engine import State, apply_move_to_state
+
+
+'''
+  The 8 symmetries of the (square) board, the dihedral group D4, as functions
+  of the (row, column) coordinates of a square
+'''
+LAST = WIDTH - 1
+
+SYMMETRIES = [lambda r, c: (r, c),               # identity
+              lambda r, c: (c, LAST - r),        # rotate 90°
+              lambda r, c: (LAST - r, LAST - c), # rotate 180°
+              lambda r, c: (LAST - c, r),        # rotate 270°
+              lambda r, c: (r, LAST - c),        # mirror left-right
+              lambda r, c: (LAST - r, c),        # mirror top-bottom
+              lambda r, c: (c, r),               # transpose
+              lambda r, c: (LAST - c, LAST - r)] # anti-transpose
+
+IDENTITY = 0
+
+# SQUARE_PERMUTATIONS[t][i] = square that square i is sent to by symmetry t
+SQUARE_PERMUTATIONS = [[row * WIDTH + column
+                            for row, column in (symmetry(i // WIDTH, i % WIDTH)
+                                                    for i in range(BOARD_SIZE))]
+                       for symmetry in SYMMETRIES]
+
+def permute_bitboard(permutation, bitboard):
+    # type: (list[int], int) -> int
+    permuted = 0
+
+    for i in range(BOARD_SIZE):
+        if (bitboard >> i) & 1:
+            permuted |= 1 << permutation[i]
+
+    return permuted
+
+# TRANSFORM_TABLES[t][bitboard] = bitboard with symmetry t applied to it
+TRANSFORM_TABLES = [tuple(permute_bitboard(permutation, bitboard)
+                          for bitboard in range(BOARD_AREA + 1))
+                    for permutation in SQUARE_PERMUTATIONS]
+
+# INVERSE_SYMMETRIES[t] undoes symmetry t
+INVERSE_SYMMETRIES = [next(u for u in range(len(SYMMETRIES))
+                           if all(TRANSFORM_TABLES[u][TRANSFORM_TABLES[t][1 << i]] == 1 << i
+                                  for i in range(BOARD_SIZE)))
+                      for t in range(len(SYMMETRIES))]
+
+def transform_bitboards(bitboards, symmetry):
+    # type: (list[int], int) -> list[int]
+    table = TRANSFORM_TABLES[symmetry]
+
+    return [table[bitboard] for bitboard in bitboards]
+
+# A move is a bitboard with a single bit set, so this also works for bitmasks
+def transform_move(move, symmetry):
+    # type: (int, int) -> int
+    return TRANSFORM_TABLES[symmetry][move]
+
+'''
+  Returns the canonical form of the board, which is the same for all 8 of its
+  symmetric variants, along with the symmetry that maps the board onto it.
+  The canonical form is the variant with the smallest (board[0], board[1]).
+  Moves found on the canonical board are mapped back to the original board with
+  transform_move(move, INVERSE_SYMMETRIES[symmetry]).
+'''
+def canonicalize_bitboards(bitboards):
+    # type: (list[int]) -> tuple[list[int], int]
+    best_symmetry = IDENTITY
+    best = bitboards
+
+    for symmetry in range(1, len(SYMMETRIES)):
+        transformed = transform_bitboards(bitboards, symmetry)
+
+        if transformed < best:
+            best_symmetry = symmetry
+            best = transformed
+
+    return list(best), best_symmetry
+
+def canonicalize_state(state):
+    # type: (State) -> tuple[State, int]
+    board, symmetry = canonicalize_bitboards(state['board'])
+
+    return { 'board': board, 'player_to_move': state['player_to_move'] }, symmetry
+
+'''
+  apply_move_to_state() for searching over canonical states: the resulting
+  state is canonicalised, so symmetric positions become the same state (and,
+  with a transposition table keyed on the state, the same node).
+  Moves in the search tree are relative to the canonical board of their parent.
+'''
+def apply_move_to_canonical_state(state, move):
+    # type: (State, int) -> State
+    return canonicalize_state(apply_move_to_state(state, move))[0]
+
+'''
+  Wraps an agent (e.g. from make_mcts_agent() using
+  apply_move_to_canonical_state) so that it only ever sees canonical states.
+  The move it picks is mapped back onto the real board.
+'''
+def make_canonical_agent(agent):
+    # type: (Callable[[State], int]) -> Callable[[State], int]
+    def canonical_agent(state):
+        # type: (State) -> int
+        canonical_state, symmetry = canonicalize_state(state)
+
+        return transform_move(agent(canonical_state), INVERSE_SYMMETRIES[symmetry])
+
+    return canonical_agent
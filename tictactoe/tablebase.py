@@ -0,0 +1,120 @@
+import numpy as np
+import numpy.typing as npt
+from .constants import BOARD_AREA, BOARD_SIZE
+from .engine import (
+    State,
+    get_valid_moves_list,
+    is_terminal,
+    apply_move_to_state,
+    check_win
+)
+
+
+'''
+  Tablebase: the exact result of every reachable tic-tac-toe position.
+  Positions are indexed in base 3, one digit per square (0 empty, 1 player 0,
+  2 player 1), which gives every board its own slot out of 3^9 = 19,683.
+  The player to move isn't part of the index: in a reachable position it
+  follows from the number of pieces (player 0 always moves first).
+  Each row of the table holds:
+    - VALUE:    the result with perfect play, for the player to move
+                (1 win, 0 draw, -1 loss), or UNREACHABLE
+    - DISTANCE: the number of plies until the game ends with perfect play
+                (the winner wins as quickly as possible, the loser holds out as
+                long as possible), or -1 if unreachable
+  It is stored as a small int8 array in a .npy file, which can be memory-mapped.
+'''
+NUM_POSITIONS = 3 ** BOARD_SIZE
+VALUE = 0
+DISTANCE = 1
+UNREACHABLE = -128
+
+# BASE_3[bitboard] is the base 3 number with a 1 digit for each set bit
+BASE_3 = tuple(sum(3 ** square for square in range(BOARD_SIZE) if bitboard & (1 << square))
+               for bitboard in range(BOARD_AREA + 1))
+
+def position_index(bitboards):
+    # type: (list[int]) -> int
+    return BASE_3[bitboards[0]] + 2 * BASE_3[bitboards[1]]
+
+'''
+  All the reachable positions, grouped by the number of pieces on the board
+  (layer n holds the positions after n plies). Games stop at terminal positions.
+'''
+def enumerate_positions():
+    # type: () -> list[list[State]]
+    layers = [[{ 'board': [0, 0], 'player_to_move': 0 }]]
+
+    for _ in range(BOARD_SIZE):
+        seen = {} # type: dict[int, State]
+
+        for state in layers[-1]:
+            for move in get_valid_moves_list(state):
+                child = apply_move_to_state(state, move)
+                seen[position_index(child['board'])] = child
+
+        layers.append(list(seen.values()))
+
+    return layers
+
+'''
+  Retrograde analysis: goes through the layers from the last (full boards)
+  back to the empty board. Terminal positions are scored by their result, and
+  every other position from its children, which are all in the next layer and
+  so already known.
+'''
+def build_tablebase():
+    # type: () -> npt.NDArray[np.int8]
+    table = np.full((NUM_POSITIONS, 2), UNREACHABLE, dtype=np.int8)
+    table[:, DISTANCE] = -1
+
+    for layer in reversed(enumerate_positions()):
+        for state in layer:
+            index = position_index(state['board'])
+
+            if is_terminal(state):
+                winner = check_win(state)
+                table[index] = (0 if winner is None else
+                                1 if winner == state['player_to_move'] else -1,
+                                0)
+                continue
+
+            children = [table[position_index(apply_move_to_state(state, move)['board'])]
+                        for move in get_valid_moves_list(state)]
+            value = max(-int(child[VALUE]) for child in children)
+            distances = [int(child[DISTANCE]) for child in children
+                         if -int(child[VALUE]) == value]
+            # Win as quickly as possible, lose (or draw) as slowly as possible
+            table[index] = (value, 1 + (min(distances) if value == 1 else max(distances)))
+
+    return table
+
+def save_tablebase(table, file_name):
+    # type: (npt.NDArray[np.int8], str) -> None
+    np.save(file_name, table)
+
+def load_tablebase(file_name, mmap=True):
+    # type: (str, bool) -> npt.NDArray[np.int8]
+    return np.load(file_name, mmap_mode='r' if mmap else None)
+
+def lookup(table, state):
+    # type: (npt.NDArray[np.int8], State) -> tuple[int, int] | None
+    value, distance = table[position_index(state['board'])]
+
+    return None if value == UNREACHABLE else (int(value), int(distance))
+
+'''
+  Hook for simulate() in mcts (bind the table with functools.partial):
+  (True, winner with perfect play) if 'state' is in the table, where the winner
+  is given like check_win() does; (False, None) otherwise
+'''
+def is_known(table, state):
+    # type: (npt.NDArray[np.int8], State) -> tuple[bool, int | None]
+    value = int(table[position_index(state['board']), VALUE])
+
+    if value == UNREACHABLE:
+        return False, None
+
+    return True, (None if value == 0 else
+                  state['player_to_move'] if value == 1 else
+                  1 - state['player_to_move'])
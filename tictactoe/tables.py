@@ -0,0 +1,64 @@
+from .constants import BOARD_AREA, THREE_IN_A_ROW
+
+
+'''
+  Lookup tables indexed by a 9-bit bitboard (0 to BOARD_AREA inclusive), built
+  once at import time so that the hot paths of the engine (every step of every
+  rollout) answer with a single index instead of looping over the lines.
+'''
+
+def contains_line(bitboard):
+    # type: (int) -> bool
+    return any(line == (bitboard & line) for line in THREE_IN_A_ROW)
+
+# HAS_LINE[bitboard] is True if 'bitboard' has three in a row
+HAS_LINE = tuple(contains_line(bitboard) for bitboard in range(BOARD_AREA + 1))
+
+'''
+  Brian Kernighan's Algorithm writing the set bits into a tuple, see
+  separate_bitboard() in engine.py
+'''
+def set_bits(bitboard):
+    # type: (int) -> tuple[int, ...]
+    bits = []
+
+    while bitboard:
+        remove_rightmost_setbit = bitboard & (bitboard - 1)
+        bits.append(bitboard ^ remove_rightmost_setbit)
+        bitboard = remove_rightmost_setbit
+
+    return tuple(bits)
+
+# MOVE_LISTS[empty_squares] is the tuple of single-bit moves onto the set bits
+# of 'empty_squares', lowest first. Shared between callers, so never copied.
+MOVE_LISTS = tuple(set_bits(bitboard) for bitboard in range(BOARD_AREA + 1))
+
+'''
+  Uniformly random move onto one of the empty squares in 'empty_squares'
+  (which must be non-zero), without building a list of the moves
+'''
+def random_square(empty_squares, random_int):
+    # type: (int, int) -> int
+    moves = MOVE_LISTS[empty_squares]
+
+    return moves[random_int % len(moves)]
+
+'''
+  Squares that would give 'bitboard' three in a row, i.e. the third square of
+  every line it already has two squares of. Whether those squares are empty is
+  up to the caller.
+'''
+def completing_squares(bitboard):
+    # type: (int) -> int
+    squares = 0
+
+    for line in THREE_IN_A_ROW:
+        missing = line & ~bitboard
+
+        if missing and missing & (missing - 1) == 0:
+            squares |= missing
+
+    return squares
+
+# WINNING_SQUARES[bitboard] is completing_squares(bitboard)
+WINNING_SQUARES = tuple(completing_squares(bitboard) for bitboard in range(BOARD_AREA + 1))
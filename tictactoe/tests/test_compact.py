@@ -0,0 +1,80 @@
+from pickle import dumps, loads
+from random import seed
+import pytest
+from mcts.mcts import make_mcts_agent
+from tictactoe import engine
+from tictactoe.compact import (
+    CompactState,
+    from_state,
+    to_state,
+    apply_move_to_state,
+    check_win,
+    is_terminal,
+    get_valid_moves_list,
+    get_state_key
+)
+
+
+def test_compact_state():
+    state = { 'board': [0b100010101, 0b011001010], 'player_to_move': 1 }
+    compact = from_state(state)
+
+    assert state == to_state(compact)
+    # Dict adapter
+    assert state['board'] == compact['board']
+    assert 1 == compact['player_to_move']
+    with pytest.raises(KeyError):
+        compact['moves']
+    # Hashable, compared by value
+    assert compact == from_state(state)
+    assert 1 == len({ compact, from_state(state) })
+    assert compact != from_state({ **state, 'player_to_move': 0 })
+    # Immutable
+    with pytest.raises(AttributeError):
+        compact.key = 0
+    assert compact == loads(dumps(compact))
+
+def test_apply_move_to_state():
+    state = { 'board': [0b100010010, 0b011000100], 'player_to_move': 1 }
+
+    for move in [0b000000001, 0b000001000, 0b000100000]:
+        assert (engine.apply_move_to_state(state, move)
+                == to_state(apply_move_to_state(from_state(state), move)))
+
+    # Occupied square: only the player to move changes, like engine.apply_move()
+    assert ({ 'board': state['board'], 'player_to_move': 0 }
+            == to_state(apply_move_to_state(from_state(state), 0b000000010)))
+
+def test_same_as_engine():
+    states = [{ 'board': [0b001001001, 0b000000110], 'player_to_move': 1 },
+              { 'board': [0b000000110, 0b111000000], 'player_to_move': 0 },
+              { 'board': [0b001110011, 0b110001100], 'player_to_move': 1 },
+              { 'board': [0b000001001, 0b000000110], 'player_to_move': 0 },
+              { 'board': [0, 0], 'player_to_move': 0 }]
+
+    for state in states:
+        compact = from_state(state)
+
+        assert engine.check_win(state) == check_win(compact)
+        assert engine.is_terminal(state) is is_terminal(compact)
+        assert engine.get_valid_moves_list(state) == get_valid_moves_list(compact)
+
+def test_get_state_key():
+    assert 0b1_000001010_100010101 == get_state_key(CompactState(0b1_000001010_100010101))
+
+def test_make_mcts_agent_compact():
+    seed(123)
+    agent = make_mcts_agent(1.2,
+                            get_valid_moves_list,
+                            is_terminal,
+                            apply_move_to_state,
+                            check_win,
+                            200,
+                            get_state_key=get_state_key)
+
+    # Player 0 can complete the top row
+    assert 0b100000000 == agent(from_state({ 'board': [0b011000000, 0b000000011],
+                                             'player_to_move': 0 }))
+    # Player 1 has to block the top row
+    assert 0b100000000 == agent(from_state({ 'board': [0b011001000, 0b000100001],
+                                             'player_to_move': 1 }))
@@ -2,7 +2,8 @@ import numpy as np
 from tictactoe.encoders import (
     one_d_to_2_d,
     state_to_one_plane_encoding,
-    one_hot_encode_move
+    one_hot_encode_move,
+    move_to_square_index
 )
 
 
@@ -38,3 +39,8 @@ def test_one_hot_encode_move():
     ) == one_hot_encode_move(0b000100000)
 
     assert result.all()
+
+def test_move_to_square_index():
+    assert 0 == move_to_square_index(0b000000001)
+    assert 4 == move_to_square_index(0b000010000)
+    assert 8 == move_to_square_index(0b100000000)
@@ -6,7 +6,10 @@ from tictactoe.engine import (
     is_full,
     check_win,
     is_terminal,
-    get_valid_moves_list
+    is_game_over,
+    get_valid_moves_list,
+    play_game_result,
+    play_n_games
 )
 
 
@@ -56,7 +59,26 @@ def test_is_terminal():
     assert False is is_terminal({'board': [1, 0]})
 
 def test_get_valid_moves_list():
-    assert [] == get_valid_moves_list({'board': [0b000011111, 0b111100000]})
-    assert [0b000000010, 0b000000100] == get_valid_moves_list({'board': [0b010110001, 0b101001000]})
-    # Terminal states should return empty list
-    assert [] == get_valid_moves_list({'board': [0b001100001, 0b010010010]})
+    assert () == get_valid_moves_list({'board': [0b000011111, 0b111100000]})
+    assert (0b000000010, 0b000000100) == get_valid_moves_list({'board': [0b010110001, 0b101001000]})
+    # Terminal states should return empty tuple
+    assert () == get_valid_moves_list({'board': [0b001100001, 0b010010010]})
+
+def test_is_game_over():
+    # Line for player 0
+    assert True is is_game_over([0b001001001, 0b010000010], 0b011001011)
+    # Full board, no line
+    assert True is is_game_over([0b001110011, 0b110001100], 0b111111111)
+    assert False is is_game_over([0b000000001, 0b000000010], 0b000000011)
+
+def first_move_agent(state): # type: (dict) -> int
+    return get_valid_moves_list(state)[0]
+
+def test_play_game_result():
+    # Squares 0 to 6 in order: player 0 gets the diagonal 0, 2, 4, 6
+    assert 0 == play_game_result([first_move_agent, first_move_agent], [[0, 0]])
+
+def test_play_n_games():
+    assert { 'wins': [3, 0], 'draws': 0 } == play_n_games([first_move_agent,
+                                                           first_move_agent],
+                                                          3)
@@ -0,0 +1,38 @@
+from tictactoe.engine import apply_move_to_state
+from tictactoe.hashing import (
+    pack_bitboards,
+    pack_state,
+    unpack_state,
+    apply_move_to_key
+)
+
+
+def test_pack_state():
+    assert 0b1_000001010_100010101 == pack_state({ 'board': [0b100010101, 0b000001010],
+                                                   'player_to_move': 1 })
+    assert 0b0_000001010_100010101 == pack_bitboards([0b100010101, 0b000001010], 0)
+    assert 0 == pack_state({ 'board': [0, 0], 'player_to_move': 0 })
+    # Same pieces, different owners
+    assert (pack_state({ 'board': [0b1, 0b10], 'player_to_move': 0 })
+            != pack_state({ 'board': [0b10, 0b1], 'player_to_move': 0 }))
+
+def test_unpack_state():
+    state = { 'board': [0b100010101, 0b011001010], 'player_to_move': 1 }
+
+    assert state == unpack_state(pack_state(state))
+    assert { 'board': [0, 0], 'player_to_move': 0 } == unpack_state(0)
+
+def test_apply_move_to_key():
+    state = { 'board': [0b100010010, 0b011000100], 'player_to_move': 1 }
+
+    for move in [0b000000001, 0b000001000, 0b000100000]:
+        assert (pack_state(apply_move_to_state(state, move))
+                == apply_move_to_key(pack_state(state), move))
+
+    state = { 'board': [0b100010010, 0b011000101], 'player_to_move': 0 }
+
+    assert (pack_state(apply_move_to_state(state, 0b000001000))
+            == apply_move_to_key(pack_state(state), 0b000001000))
+    # Occupied square
+    assert (pack_state(apply_move_to_state(state, 0b000000001))
+            == apply_move_to_key(pack_state(state), 0b000000001))
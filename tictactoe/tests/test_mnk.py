@@ -0,0 +1,201 @@
+from pickle import dumps, loads
+from random import seed, Random
+import pytest
+from mcts.mcts import make_mcts_agent
+from tictactoe.constants import THREE_IN_A_ROW
+from tictactoe import engine
+from tictactoe.mnk import (
+    square_to_move,
+    move_to_square,
+    generate_lines,
+    make_rules,
+    has_run,
+    check_win_after_move,
+    has_k_in_a_row,
+    apply_move_to_state,
+    check_win,
+    is_terminal,
+    get_valid_moves_list,
+    make_mnk_game
+)
+
+
+def test_square_to_move():
+    rules = make_rules(3, 4, 3)
+
+    assert 0b1 == square_to_move(rules, 0, 0)
+    # Rows are 5 bits apart (4 squares and a guard bit)
+    assert 1 << 7 == square_to_move(rules, 1, 2)
+    assert (1, 2) == move_to_square(rules, 1 << 7)
+
+def test_generate_lines():
+    # Without guard bits the tic-tac-toe layout comes out
+    assert sorted(THREE_IN_A_ROW) == sorted(generate_lines(3, 3, 3, 3))
+    # 4 rows + 4 columns + 2 diagonals
+    assert 10 == len(generate_lines(4, 4, 4, 5))
+    # 15 x 11 horizontal + 11 x 15 vertical + 2 x 11 x 11 diagonal
+    assert 572 == len(generate_lines(15, 15, 5, 16))
+    assert [] == generate_lines(3, 3, 4, 4)
+
+def test_make_rules():
+    rules = make_rules(2, 3, 2)
+
+    assert 4 == rules['stride']
+    assert 0b0111_0111 == rules['area']
+    assert [1, 4, 5, 3] == rules['directions']
+
+    with pytest.raises(ValueError):
+        make_rules(0, 3, 3)
+
+def test_has_run():
+    assert has_run(0b111, 1, 3)
+    assert not has_run(0b1011, 1, 3)
+    assert has_run(0b10101, 2, 3)
+    assert has_run(0b11111, 1, 5)
+    assert not has_run(0b11110, 1, 5)
+
+def test_has_k_in_a_row():
+    rng = Random(123)
+
+    # Shift-based detection agrees with checking every generated line
+    for rows, cols, k in [(3, 3, 3), (4, 4, 3), (5, 7, 4), (6, 6, 5)]:
+        rules = make_rules(rows, cols, k)
+
+        for _ in range(300):
+            bitboard = rng.getrandbits(rows * rules['stride']) & rules['area']
+
+            assert (has_k_in_a_row(rules, bitboard)
+                    == any(line == bitboard & line for line in rules['lines']))
+
+def test_no_wrap_around():
+    rules = make_rules(3, 3, 3)
+
+    # End of one row and start of the next
+    assert not has_k_in_a_row(rules, square_to_move(rules, 0, 1)
+                                     | square_to_move(rules, 0, 2)
+                                     | square_to_move(rules, 1, 0))
+    # Down-right diagonal continued past the right edge
+    assert not has_k_in_a_row(rules, square_to_move(rules, 0, 1)
+                                     | square_to_move(rules, 1, 2)
+                                     | square_to_move(rules, 2, 0))
+
+def test_same_as_engine():
+    rules = make_rules(3, 3, 3)
+
+    def to_mnk(bitboard): # type: (int) -> int
+        return sum(square_to_move(rules, square // 3, square % 3)
+                   for square in range(9) if bitboard & (1 << square))
+
+    states = [{ 'board': [0b001001001, 0b000000110], 'player_to_move': 1 },
+              { 'board': [0b000000110, 0b111000000], 'player_to_move': 0 },
+              { 'board': [0b001110011, 0b110001100], 'player_to_move': 1 },
+              { 'board': [0b000001001, 0b000000110], 'player_to_move': 0 },
+              { 'board': [0, 0], 'player_to_move': 0 }]
+
+    for state in states:
+        mnk_state = { **state, 'board': list(map(to_mnk, state['board'])) }
+
+        assert engine.check_win(state) == check_win(rules, mnk_state)
+        assert engine.is_terminal(state) == is_terminal(rules, mnk_state)
+        assert (sorted(map(to_mnk, engine.get_valid_moves_list(state)))
+                == sorted(get_valid_moves_list(rules, mnk_state)))
+
+def test_apply_move_to_state():
+    rules = make_rules(3, 4, 3)
+    state = { 'board': [0b1, 0b10], 'player_to_move': 1 }
+
+    assert ({ 'board': [0b1, 0b100010],
+              'player_to_move': 0,
+              'winner': None,
+              'terminal': False } == apply_move_to_state(rules, state, 0b100000))
+    # Occupied square, guard bit
+    assert state['board'] == apply_move_to_state(rules, state, 0b1)['board']
+    assert state['board'] == apply_move_to_state(rules, state, 0b10000)['board']
+
+def test_make_mnk_game():
+    game = loads(dumps(make_mnk_game(4, 4, 3)))
+    state = game['new_game']
+
+    assert 16 == len(game['get_valid_moves_list'](state))
+
+    # Random game to the end
+    rng = Random(1)
+    while not game['is_terminal'](state):
+        moves = game['get_valid_moves_list'](state)
+        state = game['apply_move_to_state'](state, moves[rng.randint(0, len(moves) - 1)])
+
+    assert [] == game['get_valid_moves_list'](state)
+
+def test_make_mcts_agent_mnk():
+    seed(123)
+    game = make_mnk_game(4, 4, 4)
+    rules = game['rules']
+    agent = make_mcts_agent(1.2,
+                            game['get_valid_moves_list'],
+                            game['is_terminal'],
+                            game['apply_move_to_state'],
+                            game['check_win'],
+                            500)
+    # Player 0 can complete the second row
+    row = [square_to_move(rules, 1, col) for col in range(3)]
+    state = { 'board': [sum(row), square_to_move(rules, 0, 0)
+                                  | square_to_move(rules, 2, 2)
+                                  | square_to_move(rules, 3, 1)],
+              'player_to_move': 0 }
+
+    assert square_to_move(rules, 1, 3) == agent(state)
+
+def test_lines_through():
+    rules = make_rules(3, 3, 3)
+
+    # Row, column and both diagonals through the centre
+    assert 4 == len(rules['lines_through'][square_to_move(rules, 1, 1).bit_length() - 1])
+    assert 3 == len(rules['lines_through'][square_to_move(rules, 0, 0).bit_length() - 1])
+    assert 2 == len(rules['lines_through'][square_to_move(rules, 0, 1).bit_length() - 1])
+    # Guard bit
+    assert [] == rules['lines_through'][3]
+
+def test_check_win_after_move():
+    rules = make_rules(3, 3, 3)
+    row = [square_to_move(rules, 1, col) for col in range(3)]
+
+    assert check_win_after_move(rules, sum(row), row[2])
+    # Lines that don't go through the move aren't looked at
+    assert not check_win_after_move(rules,
+                                    sum(row) | square_to_move(rules, 2, 1),
+                                    square_to_move(rules, 2, 1))
+
+def test_cached_result():
+    game = make_mnk_game(3, 3, 3)
+    rules = game['rules']
+    state = game['new_game']
+
+    for row, col in [(0, 0), (1, 0), (0, 1), (1, 1)]:
+        state = game['apply_move_to_state'](state, square_to_move(rules, row, col))
+
+        assert None is state['winner']
+        assert False is state['terminal']
+
+    state = game['apply_move_to_state'](state, square_to_move(rules, 0, 2))
+
+    assert 0 == state['winner']
+    assert True is state['terminal']
+    assert 0 == game['check_win'](state)
+    assert game['is_terminal'](state)
+    # Same answer as checking from scratch
+    assert 0 == game['check_win']({ 'board': state['board'], 'player_to_move': 1 })
+
+    # Draw, filling the last square:
+    # O X O
+    # O X X
+    # X O O
+    def squares(*coordinates): # type: (*tuple[int, int]) -> int
+        return sum(square_to_move(rules, row, col) for row, col in coordinates)
+
+    draw = { 'board': [squares((0, 0), (1, 0), (2, 1), (2, 2)),
+                       squares((0, 1), (1, 1), (1, 2), (2, 0))],
+             'player_to_move': 0 }
+    draw = game['apply_move_to_state'](draw, square_to_move(rules, 0, 2))
+
+    assert None is draw['winner']
+    assert True is draw['terminal']
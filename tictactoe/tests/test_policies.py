@@ -0,0 +1,82 @@
+from random import seed, randint
+from sys import maxsize
+from mcts.mcts import simulate, make_mcts_agent
+from tictactoe.engine import (
+    get_valid_moves_list,
+    is_terminal,
+    apply_move_to_state,
+    check_win
+)
+from tictactoe.policies import empty_squares, decisive_move, anti_decisive_move
+
+
+def random_int():
+    # type: () -> int
+    return randint(0, maxsize)
+
+def test_empty_squares():
+    assert 0b111111111 == empty_squares({ 'board': [0, 0], 'player_to_move': 0 })
+    assert 0b010101100 == empty_squares({ 'board': [0b100000011, 0b001010000],
+                                          'player_to_move': 1 })
+
+def test_decisive_move():
+    seed(123)
+    # Takes the win
+    assert all(0b001000000 == decisive_move({ 'board': [0b000001001, 0b000010010],
+                                              'player_to_move': 0 },
+                                            random_int)
+               for _ in range(10))
+    # Two wins: either
+    assert { 0b000000100, 0b010000000 } == { decisive_move({ 'board': [0b000010011,
+                                                                       0b100001000],
+                                                             'player_to_move': 0 },
+                                                           random_int)
+                                             for _ in range(50) }
+    # Doesn't block
+    state = { 'board': [0b000000011, 0b000010000], 'player_to_move': 1 }
+    assert set(get_valid_moves_list(state)) == { decisive_move(state, random_int)
+                                                 for _ in range(200) }
+
+def test_anti_decisive_move():
+    seed(123)
+    # Takes the win rather than blocking
+    assert all(0b001000000 == anti_decisive_move({ 'board': [0b000001001, 0b000010010],
+                                                   'player_to_move': 0 },
+                                                 random_int)
+               for _ in range(10))
+    # Blocks
+    assert all(0b000000100 == anti_decisive_move({ 'board': [0b000000011, 0b000010000],
+                                                   'player_to_move': 1 },
+                                                 random_int)
+               for _ in range(10))
+    # Nothing decisive: any empty square
+    state = { 'board': [0b000010000, 0b000000001], 'player_to_move': 0 }
+    assert set(get_valid_moves_list(state)) == { anti_decisive_move(state, random_int)
+                                                 for _ in range(200) }
+
+def test_simulate_with_rollout_policy():
+    seed(123)
+    # O can only block one of X's threats, and X then always takes the other
+    state = { 'board': [0b000010011, 0b100001000], 'player_to_move': 1 }
+
+    assert all(0 == simulate(is_terminal,
+                             check_win,
+                             get_valid_moves_list,
+                             random_int,
+                             apply_move_to_state,
+                             state,
+                             rollout_policy=policy)
+               for policy in [decisive_move, anti_decisive_move]
+               for _ in range(20))
+
+def test_mcts_agent_with_rollout_policy():
+    seed(123)
+    agent = make_mcts_agent(1.2,
+                            get_valid_moves_list,
+                            is_terminal,
+                            apply_move_to_state,
+                            check_win,
+                            100,
+                            rollout_policy=decisive_move)
+
+    assert 0b000000100 == agent({ 'board': [0b000000011, 0b000010000], 'player_to_move': 1 })
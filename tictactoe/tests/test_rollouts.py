@@ -0,0 +1,65 @@
+import numpy as np
+from tictactoe.rollouts import (
+    NO_WINNER,
+    has_line,
+    pick_random_bits,
+    play_out_batch,
+    batch_rollout
+)
+
+
+def test_has_line():
+    assert [True, True, False, False] == list(has_line(np.array([0b001001001,
+                                                                 0b111000101,
+                                                                 0b000001001,
+                                                                 0])))
+
+def test_pick_random_bits():
+    rng = np.random.default_rng(123)
+    bitboards = np.array([0b010110010, 0b100000000, 0b111111111] * 100)
+    picked = pick_random_bits(bitboards, rng)
+
+    # Exactly one bit, which was set in the original bitboard
+    assert (picked & (picked - 1) == 0).all()
+    assert (picked & bitboards == picked).all()
+    assert {0b000000010, 0b000010000, 0b000100000, 0b010000000} == set(picked[0::3].tolist())
+    assert {0b100000000} == set(picked[1::3].tolist())
+    assert 9 == len(set(picked[2::3].tolist()))
+
+def test_play_out_batch():
+    rng = np.random.default_rng(123)
+
+    # Terminal states: same results as check_win()
+    assert [0, 1, NO_WINNER] == list(play_out_batch(np.array([[0b001001101, 0b100010010],
+                                                              [0b001010100, 0b111000000],
+                                                              [0b001110011, 0b110001100]]),
+                                                    np.array([1, 0, 0]),
+                                                    rng))
+
+    # Player 0 wins by playing the last square; full board is a draw
+    assert [0, NO_WINNER] == list(play_out_batch(np.array([[0b010110001, 0b001001110],
+                                                           [0b010101101, 0b101010010]]),
+                                                 np.array([0, 1]),
+                                                 rng))
+
+    # Two squares left, player 1 to move: either wins or the game is drawn
+    results = play_out_batch(np.array([[0b010100101, 0b000011010]] * 50),
+                             np.array([1] * 50),
+                             rng)
+    assert {0, NO_WINNER} == set(results.tolist())
+
+    # Random games from the empty board. Player 0 should win more often
+    results = play_out_batch(np.zeros((2000, 2), dtype=np.int64),
+                             np.zeros(2000, dtype=np.int64),
+                             rng)
+    assert (results == 0).sum() > (results == 1).sum() > (results == NO_WINNER).sum()
+
+def test_batch_rollout():
+    assert [None, None] == batch_rollout({ 'board': [0b001110011, 0b110001100],
+                                           'player_to_move': 1 },
+                                         2,
+                                         lambda: 7)
+    assert 5 == len(batch_rollout({ 'board': [0, 0], 'player_to_move': 0 }, 5, lambda: 7))
+    # Seeded from random_int()
+    assert (batch_rollout({ 'board': [0, 0], 'player_to_move': 0 }, 20, lambda: 7)
+            == batch_rollout({ 'board': [0, 0], 'player_to_move': 0 }, 20, lambda: 7))
@@ -0,0 +1,96 @@
+from multiprocessing import Process, Queue, get_start_method
+from random import seed
+from sys import exit
+import numpy as np
+import pytest
+from tictactoe.self_play import (
+    make_self_play_agent,
+    play_self_play_game,
+    get_from_workers,
+    concatenate_examples,
+    generate_self_play_data
+)
+
+
+def test_make_self_play_agent():
+    seed(123)
+    move, statistics = make_self_play_agent(1.2, 200)({ 'board': [0b011000000, 0b000000011],
+                                                        'player_to_move': 0 })
+
+    # Player 0 can complete the top row
+    assert 0b100000000 == move
+    assert (9,) == statistics['policy'].shape
+    assert 8 == np.argmax(statistics['policy'])
+    # Occupied squares are never visited
+    assert 0 == statistics['policy'][[0, 1, 6, 7]].sum()
+
+def test_play_self_play_game():
+    seed(123)
+    game = play_self_play_game(make_self_play_agent(1.2, 50), 2)
+    plies = len(game['outcomes'])
+
+    assert (plies, 3, 3) == game['states'].shape
+    assert (plies, 3, 3) == game['policies'].shape
+    assert np.allclose(1, game['policies'].sum(axis=(1, 2)))
+    # First position is the empty board
+    assert 0 == np.abs(game['states'][0]).sum()
+    # Outcomes alternate between the players (or are all draws)
+    assert all(game['outcomes'][1:] == -game['outcomes'][:-1])
+
+def test_concatenate_examples():
+    seed(1)
+    game = play_self_play_game(make_self_play_agent(1.2, 20), 0)
+    examples = concatenate_examples([game, game])
+
+    assert 2 * len(game['outcomes']) == len(examples['outcomes'])
+    assert len(examples['states']) == len(examples['policies'])
+
+def test_generate_self_play_data(tmp_path):
+    seed(123)
+    summary = generate_self_play_data(str(tmp_path),
+                                      5,
+                                      workers=2,
+                                      iterations=20,
+                                      shard_size=16,
+                                      queue_size=2)
+
+    assert 5 == summary['games']
+
+    shards = [np.load(shard) for shard in summary['shards']]
+    sizes = [len(shard['outcomes']) for shard in shards]
+
+    assert summary['positions'] == sum(sizes)
+    assert all(size == 16 for size in sizes[:-1])
+    assert 0 < sizes[-1] <= 16
+    for shard in shards:
+        assert len(shard['outcomes']) == len(shard['states']) == len(shard['policies'])
+
+def test_get_from_workers():
+    queue = Queue() # type: Queue
+    queue.put(None)
+    assert None is get_from_workers(queue, [])
+
+    # A worker that failed sends its traceback
+    queue.put('Traceback...')
+    with pytest.raises(RuntimeError, match='Traceback'):
+        get_from_workers(queue, [])
+
+    # A worker that died without sending anything
+    process = Process(target=exit, args=(3,))
+    process.start()
+    process.join()
+    with pytest.raises(RuntimeError, match='code 3'):
+        get_from_workers(queue, [process])
+
+def fail_to_play(agent, sampling_plies): # type: (object, int) -> None
+    raise ValueError('Failed on purpose')
+
+def test_generate_self_play_data_worker_failure(tmp_path, monkeypatch):
+    if get_start_method() != 'fork':
+        pytest.skip('Only forked workers inherit the patched module')
+
+    seed(123)
+    monkeypatch.setattr('tictactoe.self_play.play_self_play_game', fail_to_play)
+
+    with pytest.raises(RuntimeError, match='Failed on purpose'):
+        generate_self_play_data(str(tmp_path), 4, workers=2, iterations=20)
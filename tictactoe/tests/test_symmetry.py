@@ -0,0 +1,81 @@
+from random import seed
+from tictactoe.engine import (
+    get_valid_moves_list,
+    is_terminal,
+    check_win
+)
+from tictactoe.hashing import pack_state
+from tictactoe.symmetry import (
+    SYMMETRIES,
+    IDENTITY,
+    INVERSE_SYMMETRIES,
+    transform_bitboards,
+    transform_move,
+    canonicalize_bitboards,
+    canonicalize_state,
+    apply_move_to_canonical_state,
+    make_canonical_agent
+)
+from mcts.mcts import make_mcts_agent
+
+
+def test_transform_bitboards():
+    # Rotating the corner 90° four times gets back to the start
+    assert [0b000000100] == transform_bitboards([0b000000001], 1)
+    assert [0b100000000] == transform_bitboards([0b000000100], 1)
+    assert [0b001000000] == transform_bitboards([0b100000000], 1)
+    assert [0b000000001] == transform_bitboards([0b001000000], 1)
+    # Centre never moves
+    assert all([0b000010000] == transform_bitboards([0b000010000], t)
+               for t in range(len(SYMMETRIES)))
+    # Lines stay lines
+    assert [0b001001001, 0b111000000] == transform_bitboards([0b000000111, 0b100100100], 6)
+
+def test_transform_move():
+    for t in range(len(SYMMETRIES)):
+        for i in range(9):
+            assert 1 << i == transform_move(transform_move(1 << i, t), INVERSE_SYMMETRIES[t])
+
+def test_canonicalize_bitboards():
+    bitboards = [0b000010001, 0b000000010]
+    canonical, symmetry = canonicalize_bitboards(bitboards)
+
+    assert transform_bitboards(bitboards, symmetry) == canonical
+
+    # All 8 variants have the same canonical form
+    for t in range(len(SYMMETRIES)):
+        assert canonical == canonicalize_bitboards(transform_bitboards(bitboards, t))[0]
+
+    # Already canonical
+    assert ([0, 0], IDENTITY) == canonicalize_bitboards([0, 0])
+
+def test_canonicalize_state():
+    state, symmetry = canonicalize_state({ 'board': [0b100000000, 0], 'player_to_move': 1 })
+
+    assert { 'board': [0b000000001, 0], 'player_to_move': 1 } == state
+    assert 0b100000000 == transform_move(0b000000001, INVERSE_SYMMETRIES[symmetry])
+
+def test_apply_move_to_canonical_state():
+    empty_board = { 'board': [0, 0], 'player_to_move': 0 }
+
+    # Only 3 different first moves: corner, edge and centre
+    assert 3 == len(set(map(lambda move: pack_state(apply_move_to_canonical_state(empty_board,
+                                                                                   move)),
+                            get_valid_moves_list(empty_board))))
+
+def test_make_canonical_agent():
+    seed(123)
+    agent = make_canonical_agent(make_mcts_agent(1.2,
+                                                 get_valid_moves_list,
+                                                 is_terminal,
+                                                 apply_move_to_canonical_state,
+                                                 check_win,
+                                                 200,
+                                                 get_state_key=pack_state))
+
+    # Player 0 can complete the top row; in every orientation of the board
+    for t in range(len(SYMMETRIES)):
+        board = transform_bitboards([0b011000000, 0b000000011], t)
+
+        assert transform_move(0b100000000, t) == agent({ 'board': board,
+                                                         'player_to_move': 0 })
@@ -0,0 +1,123 @@
+from functools import partial
+from random import seed, randint
+from sys import maxsize
+import numpy as np
+from mcts.mcts import simulate, make_mcts_agent
+from negamax.negamax import make_memo, solve
+from tictactoe.engine import (
+    get_valid_moves_list,
+    is_terminal,
+    apply_move_to_state,
+    check_win
+)
+from tictactoe.hashing import pack_state
+from tictactoe.tablebase import (
+    NUM_POSITIONS,
+    VALUE,
+    DISTANCE,
+    UNREACHABLE,
+    position_index,
+    enumerate_positions,
+    build_tablebase,
+    save_tablebase,
+    load_tablebase,
+    lookup,
+    is_known
+)
+
+
+table = build_tablebase()
+
+def test_position_index():
+    assert 0 == position_index([0, 0])
+    assert 1 == position_index([0b000000001, 0])
+    assert 2 == position_index([0, 0b000000001])
+    assert 3 + 2 * 9 == position_index([0b000000010, 0b000000100])
+    assert NUM_POSITIONS - 1 == position_index([0, 0b111111111])
+
+def test_enumerate_positions():
+    layers = enumerate_positions()
+
+    assert 10 == len(layers)
+    assert [1, 9, 72, 252, 756, 1260, 1520, 1140, 390, 78] == [len(layer) for layer in layers]
+    assert 5478 == sum(len(layer) for layer in layers)
+
+def test_build_tablebase():
+    assert (NUM_POSITIONS, 2) == table.shape
+    assert np.int8 == table.dtype
+    assert 5478 == np.count_nonzero(table[:, VALUE] != UNREACHABLE)
+    # Unreachable positions have no distance, and no game is longer than 9 plies
+    assert np.all((table[:, DISTANCE] == -1) == (table[:, VALUE] == UNREACHABLE))
+    assert 9 == table[:, DISTANCE].max()
+    # Tic-tac-toe is a draw, which takes all 9 plies
+    assert (0, 9) == lookup(table, { 'board': [0, 0], 'player_to_move': 0 })
+    # X to play and win on the spot
+    assert (1, 1) == lookup(table, { 'board': [0b000000011, 0b000011000],
+                                     'player_to_move': 0 })
+    # O to play, but X has two threats
+    assert (-1, 2) == lookup(table, { 'board': [0b000010011, 0b100001000],
+                                      'player_to_move': 1 })
+    # Game over
+    assert (-1, 0) == lookup(table, { 'board': [0b000000111, 0b000011000],
+                                      'player_to_move': 1 })
+    # Unreachable: both players have three in a row
+    assert lookup(table, { 'board': [0b000000111, 0b000111000],
+                           'player_to_move': 0 }) is None
+
+def test_tablebase_matches_negamax():
+    settings = { 'get_valid_moves': get_valid_moves_list,
+                 'is_terminal': is_terminal,
+                 'apply_move': apply_move_to_state,
+                 'check_win': check_win,
+                 'get_state_key': pack_state,
+                 'order_moves': None }
+    memo = make_memo()
+
+    for layer in enumerate_positions():
+        for state in layer[::7]:
+            assert solve(settings, memo, state)['value'] == lookup(table, state)[0]
+
+def test_save_and_load_tablebase(tmp_path):
+    file_name = str(tmp_path / 'tablebase.npy')
+    save_tablebase(table, file_name)
+    mapped = load_tablebase(file_name)
+
+    assert isinstance(mapped, np.memmap)
+    assert np.array_equal(table, mapped)
+    assert not isinstance(load_tablebase(file_name, mmap=False), np.memmap)
+
+def test_is_known():
+    assert (True, None) == is_known(table, { 'board': [0, 0], 'player_to_move': 0 })
+    assert (True, 0) == is_known(table, { 'board': [0b000000011, 0b000011000],
+                                          'player_to_move': 0 })
+    assert (True, 0) == is_known(table, { 'board': [0b000010011, 0b100001000],
+                                          'player_to_move': 1 })
+    assert (False, None) == is_known(table, { 'board': [0b000000111, 0b000111000],
+                                              'player_to_move': 0 })
+
+def test_simulate_with_tablebase():
+    seed(123)
+    known_result = partial(is_known, table)
+    state = { 'board': [0b000010011, 0b100001000], 'player_to_move': 1 }
+
+    assert all(0 == simulate(is_terminal,
+                             check_win,
+                             get_valid_moves_list,
+                             lambda: randint(0, maxsize),
+                             apply_move_to_state,
+                             state,
+                             known_result)
+               for _ in range(20))
+
+def test_mcts_agent_with_tablebase():
+    seed(123)
+    agent = make_mcts_agent(1.2,
+                            get_valid_moves_list,
+                            is_terminal,
+                            apply_move_to_state,
+                            check_win,
+                            200,
+                            known_result=partial(is_known, table))
+
+    # Has to block the row
+    assert 0b000000100 == agent({ 'board': [0b000000011, 0b000010000], 'player_to_move': 1 })
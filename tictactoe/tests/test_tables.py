@@ -0,0 +1,56 @@
+from tictactoe.constants import BOARD_AREA, THREE_IN_A_ROW
+from tictactoe.tables import (
+    contains_line,
+    HAS_LINE,
+    set_bits,
+    MOVE_LISTS,
+    random_square,
+    completing_squares,
+    WINNING_SQUARES
+)
+
+
+def test_contains_line():
+    assert True is contains_line(0b001001001)
+    assert True is contains_line(0b101010001) # diagonal plus an extra piece
+    assert False is contains_line(0b000001001)
+    assert False is contains_line(0)
+
+def test_has_line():
+    assert BOARD_AREA + 1 == len(HAS_LINE)
+    assert all(HAS_LINE[line] for line in THREE_IN_A_ROW)
+    assert True is HAS_LINE[BOARD_AREA]
+    assert False is HAS_LINE[0b110001110]
+    assert all(HAS_LINE[bitboard] == contains_line(bitboard)
+               for bitboard in range(BOARD_AREA + 1))
+
+def test_set_bits():
+    assert (0b000000010, 0b000010000, 0b000100000, 0b010000000) == set_bits(0b010110010)
+    assert () == set_bits(0)
+
+def test_move_lists():
+    assert BOARD_AREA + 1 == len(MOVE_LISTS)
+    assert () == MOVE_LISTS[0]
+    assert (0b000000001, 0b100000000) == MOVE_LISTS[0b100000001]
+    assert all(sum(moves) == bitboard for bitboard, moves in enumerate(MOVE_LISTS))
+
+def test_random_square():
+    assert 0b000000001 == random_square(0b100000001, 0)
+    assert 0b100000000 == random_square(0b100000001, 1)
+    assert 0b000000001 == random_square(0b100000001, 2)
+    # Every empty square can be drawn
+    assert set(MOVE_LISTS[0b010110010]) == set(random_square(0b010110010, i) for i in range(4))
+
+def test_completing_squares():
+    assert 0 == completing_squares(0)
+    assert 0 == completing_squares(0b000000001)
+    assert 0b000000100 == completing_squares(0b000000011)
+    # 0, 1 -> 2 and 0, 4 -> 8 and 1, 4 -> 7
+    assert 0b110000100 == completing_squares(0b000010011)
+    # A complete line doesn't need completing
+    assert 0 == completing_squares(0b000000111)
+
+def test_winning_squares():
+    assert BOARD_AREA + 1 == len(WINNING_SQUARES)
+    assert all(WINNING_SQUARES[bitboard] == completing_squares(bitboard)
+               for bitboard in range(BOARD_AREA + 1))
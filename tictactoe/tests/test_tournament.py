@@ -0,0 +1,85 @@
+from random import seed, randint, random
+from sys import maxsize
+from tictactoe.engine import get_valid_moves_list, make_random_agent
+from tictactoe.tournament import (
+    play_recorded_game,
+    play_games,
+    summarise_games,
+    run_tournament
+)
+
+
+def first_move_agent(state): # type: (dict) -> int
+    return get_valid_moves_list(state)[0]
+
+def make_random_agents(): # type: () -> list
+    return [make_random_agent(get_valid_moves_list), make_random_agent(get_valid_moves_list)]
+
+def test_play_recorded_game():
+    record = play_recorded_game([first_move_agent, first_move_agent],
+                                { 'board': [0, 0], 'player_to_move': 0 })
+
+    # Squares 0 to 6 in order: player 0 gets the diagonal 0, 2, 4, 6
+    assert 0 == record['winner']
+    assert 7 == record['plies']
+    assert [4, 3] == list(map(len, record['latencies_ms']))
+    assert all(latency >= 0 for latency in record['latencies_ms'][0])
+
+def test_play_games():
+    def results(records): # type: (list) -> list
+        return [(record['winner'], record['plies']) for record in records]
+
+    # Same seed, same games
+    assert (results(play_games(make_random_agents, 5, 42))
+            == results(play_games(make_random_agents, 5, 42)))
+    assert 5 == len(play_games(make_random_agents, 5, 42))
+
+def test_summarise_games():
+    records = [{ 'winner': 0, 'plies': 5, 'latencies_ms': [[1.0, 2.0, 3.0], [4.0, 2.0]] },
+               { 'winner': None, 'plies': 9, 'latencies_ms': [[1.0, 1.0, 1.0, 1.0, 0.0],
+                                                               [2.0, 2.0, 2.0, 0.0]] }]
+
+    assert { 'games': 2,
+             'wins': [1, 0],
+             'draws': 1,
+             'mean_plies': 7.0,
+             'moves': [8, 6],
+             'mean_latency_ms': [1.25, 2.0],
+             'max_latency_ms': [3.0, 4.0],
+             'elapsed_ms': 10.0 } == summarise_games(records, 2, 10.0)
+
+def test_run_tournament():
+    seed(123)
+    result = run_tournament(make_random_agents, 20)
+
+    assert 20 == result['games']
+    assert 20 == sum(result['wins']) + result['draws']
+
+    seed(123)
+    assert result['wins'] == run_tournament(make_random_agents, 20)['wins']
+
+def test_run_tournament_keeps_global_generator():
+    agents_made = []
+
+    def make_counted_agents(): # type: () -> list
+        agents_made.append(1)
+        return make_random_agents()
+
+    # Only the worker seed is drawn from the caller's generator
+    seed(123)
+    run_tournament(make_counted_agents, 5)
+    after_tournament = random()
+    seed(123)
+    randint(0, maxsize)
+
+    assert random() == after_tournament
+    # The agents are only built to play
+    assert 1 == len(agents_made)
+
+def test_run_tournament_workers():
+    seed(123)
+    result = run_tournament(make_random_agents, 21, workers=2)
+
+    assert 21 == result['games']
+    assert 21 == sum(result['wins']) + result['draws']
+    assert result['moves'][0] >= result['moves'][1]
@@ -0,0 +1,112 @@
+from typing import TypedDict, List, Callable
+from concurrent.futures import ProcessPoolExecutor
+from random import seed, randint, getstate, setstate
+from sys import maxsize
+from time import perf_counter
+from .constants import NEW_GAME
+from .engine import State, apply_move_to_state, is_terminal, check_win
+
+
+'''
+  Harness for running many games between agents and collecting statistics,
+  e.g. for benchmarking agents against each other.
+  Games can be spread over a process pool. Agents are usually closures, which
+  can't be sent to other processes, so each worker builds its own with
+  'make_agents', which must be defined at the top level of a module.
+'''
+class GameRecord(TypedDict):
+    winner: 'int | None'
+    plies: int
+    latencies_ms: List[List[float]] # time taken by each move, per player
+
+class TournamentResult(TypedDict):
+    games: int
+    wins: List[int]
+    draws: int
+    mean_plies: float
+    moves: List[int] # per player
+    mean_latency_ms: List[float] # per player
+    max_latency_ms: List[float] # per player
+    elapsed_ms: float
+
+def play_recorded_game(agents, initial_state):
+    # type: (list[Callable[[State], int]], State) -> GameRecord
+    state = initial_state
+    plies = 0
+    latencies_ms = [[] for _ in agents] # type: list[list[float]]
+
+    while not is_terminal(state):
+        player_to_move = state['player_to_move']
+        started = perf_counter()
+        move = agents[player_to_move](state)
+        latencies_ms[player_to_move].append((perf_counter() - started) * 1000)
+        state = apply_move_to_state(state, move)
+        plies += 1
+
+    return { 'winner': check_win(state), 'plies': plies, 'latencies_ms': latencies_ms }
+
+'''
+  Entry point for the worker processes: seeds the global random number
+  generator (which the agents in this repo draw from) before building the
+  agents, so that every worker plays different, reproducible games
+'''
+def play_games(make_agents, num_games, worker_seed):
+    # type: (Callable[[], list[Callable[[State], int]]], int, int) -> list[GameRecord]
+    seed(worker_seed)
+    agents = make_agents()
+
+    return [play_recorded_game(agents, { 'board': NEW_GAME, 'player_to_move': 0 })
+            for _ in range(num_games)]
+
+def summarise_games(records, num_players, elapsed_ms):
+    # type: (list[GameRecord], int, float) -> TournamentResult
+    latencies_ms = [[latency for record in records for latency in record['latencies_ms'][player]]
+                    for player in range(num_players)]
+
+    return { 'games': len(records),
+             'wins': [sum(1 for record in records if record['winner'] == player)
+                      for player in range(num_players)],
+             'draws': sum(1 for record in records if record['winner'] is None),
+             'mean_plies': (sum(record['plies'] for record in records) / len(records)
+                            if records else 0.0),
+             'moves': [len(latencies) for latencies in latencies_ms],
+             'mean_latency_ms': [sum(latencies) / len(latencies) if latencies else 0.0
+                                 for latencies in latencies_ms],
+             'max_latency_ms': [max(latencies, default=0.0) for latencies in latencies_ms],
+             'elapsed_ms': elapsed_ms }
+
+'''
+  Plays 'num_games' games between the agents built by 'make_agents', over
+  'workers' processes (in this process if workers <= 1).
+  Seeds for the workers are drawn from the global generator, so seeding it
+  makes the whole tournament reproducible. When the games are played in this
+  process, the generator's state is restored afterwards, so that the caller's
+  generator isn't left reseeded.
+'''
+def run_tournament(make_agents, num_games, workers=1):
+    # type: (Callable[[], list[Callable[[State], int]]], int, int) -> TournamentResult
+    started = perf_counter()
+    workers = max(1, min(workers, num_games))
+    games_per_worker = [num_games // workers + (1 if i < num_games % workers else 0)
+                        for i in range(workers)]
+    worker_seeds = [randint(0, maxsize) for _ in games_per_worker]
+
+    if workers == 1:
+        saved_state = getstate()
+
+        try:
+            records = play_games(make_agents, num_games, worker_seeds[0])
+        finally:
+            setstate(saved_state)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            records = [record
+                       for worker_records in executor.map(play_games,
+                                                          [make_agents] * workers,
+                                                          games_per_worker,
+                                                          worker_seeds)
+                       for record in worker_records]
+
+    return summarise_games(records,
+                           len(records[0]['latencies_ms']) if records else 0,
+                           (perf_counter() - started) * 1000)